@@ -0,0 +1,83 @@
+"""
+Database settings from the environment.
+
+DATABASE_ENGINE selects 'sqlite' (default) or 'postgres'. PostgreSQL keeps
+connections open for DATABASE_CONN_MAX_AGE seconds instead of reconnecting on
+every request. SQLite entries carry PRAGMAS, which comments/database.py applies
+to each connection when it opens: WAL lets readers and a writer work at the
+same time, and busy_timeout makes writers wait for the lock instead of failing
+with "database is locked".
+
+Imported by settings, so it must not import app code.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+# Django's own SQLite behaviour, for comparison in benchmark_db_writes
+SQLITE_DEFAULT_PRAGMAS = {}
+SQLITE_TUNED_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # safe with WAL; only the last commits can be lost on power failure
+    'busy_timeout': 5000,  # milliseconds
+    'mmap_size': 256 * 1024 ** 2,
+}
+
+
+def sqlite_pragmas(env=os.environ):
+    if env.get('SQLITE_TUNING', '1') != '1':
+        return dict(SQLITE_DEFAULT_PRAGMAS)
+    return {
+        'journal_mode': env.get('SQLITE_JOURNAL_MODE', SQLITE_TUNED_PRAGMAS['journal_mode']),
+        'synchronous': env.get('SQLITE_SYNCHRONOUS', SQLITE_TUNED_PRAGMAS['synchronous']),
+        'busy_timeout': int(env.get('SQLITE_BUSY_TIMEOUT', SQLITE_TUNED_PRAGMAS['busy_timeout'])),
+        'mmap_size': int(env.get('SQLITE_MMAP_SIZE', SQLITE_TUNED_PRAGMAS['mmap_size'])),
+    }
+
+
+def sqlite_database(name, pragmas):
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        # Seconds Python's sqlite3 waits for a lock; kept in step with busy_timeout
+        'OPTIONS': {'timeout': pragmas.get('busy_timeout', 5000) / 1000},
+        'PRAGMAS': pragmas,
+    }
+
+
+def database_config(base_dir, env=os.environ):
+    """Return the ``DATABASES['default']`` entry described by the environment."""
+    engine = env.get('DATABASE_ENGINE', 'sqlite')
+    if engine == 'sqlite':
+        return sqlite_database(env.get('DATABASE_NAME', str(base_dir / 'db.sqlite3')), sqlite_pragmas(env))
+    if engine in ('postgres', 'postgresql'):
+        return {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': env.get('DATABASE_NAME', 'comment_system'),
+            'USER': env.get('DATABASE_USER', ''),
+            'PASSWORD': env.get('DATABASE_PASSWORD', ''),
+            'HOST': env.get('DATABASE_HOST', ''),
+            'PORT': env.get('DATABASE_PORT', ''),
+            # Persistent connections, checked before reuse so a dropped one is replaced
+            'CONN_MAX_AGE': int(env.get('DATABASE_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            # Behind PgBouncer in transaction mode, server-side cursors do not survive between statements
+            'DISABLE_SERVER_SIDE_CURSORS': env.get('DATABASE_POOLER') == 'pgbouncer',
+            'OPTIONS': {'connect_timeout': int(env.get('DATABASE_CONNECT_TIMEOUT', '5'))},
+        }
+    raise ImproperlyConfigured(f"Unknown DATABASE_ENGINE {engine!r}; use 'sqlite' or 'postgres'.")
+
+
+def replica_configs(primary, env=os.environ):
+    """
+    Return ``{alias: settings}`` for DATABASE_REPLICAS, a comma-separated list
+    of SQLite files or PostgreSQL hosts that otherwise share the primary's
+    settings. Tests read replicas through the primary's test database.
+    """
+    replicas = {}
+    for index, location in enumerate(filter(None, env.get('DATABASE_REPLICAS', '').split(',')), start=1):
+        replica = dict(primary, TEST={'MIRROR': 'default'})
+        replica['NAME' if primary['ENGINE'] == 'django.db.backends.sqlite3' else 'HOST'] = location.strip()
+        replicas[f'replica_{index}'] = replica
+    return replicas
+
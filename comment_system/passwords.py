@@ -0,0 +1,24 @@
+"""
+PASSWORD_HASHERS for a PASSWORD_HASH_POLICY. The policies name the hashers in
+comments/hashers.py by dotted path; imported by settings, so it must not
+import app code.
+"""
+
+# PASSWORD_HASH_POLICY -> hasher used for new and upgraded hashes
+POLICIES = {
+    'pbkdf2': 'comments.hashers.PBKDF2PasswordHasher',
+    'argon2': 'comments.hashers.Argon2PasswordHasher',
+    'bcrypt': 'comments.hashers.BCryptSHA256PasswordHasher',
+}
+
+# Still accepted for verification, whatever the policy
+LEGACY_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+
+def password_hashers(policy):
+    """PASSWORD_HASHERS for ``policy``: its hasher first, then every other one."""
+    preferred = POLICIES[policy]
+    return [preferred, *(path for path in POLICIES.values() if path != preferred), *LEGACY_HASHERS]
@@ -13,6 +13,9 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 from pathlib import Path
 import os  # For environment variables
 
+from comment_system.database import database_config, replica_configs
+from comment_system.passwords import password_hashers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -48,6 +51,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'comments.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -74,14 +78,77 @@ WSGI_APPLICATION = 'comment_system.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
-
+#
+# Configured from the environment by comment_system/database.py: DATABASE_ENGINE=sqlite
+# (default, tuned with WAL etc. unless SQLITE_TUNING=0) or postgres, with
+# DATABASE_NAME/USER/PASSWORD/HOST/PORT and DATABASE_CONN_MAX_AGE.
 DATABASES = {
+    'default': database_config(BASE_DIR),
+}
+
+# Read replicas (comments/routers.py): DATABASE_REPLICAS lists replica SQLite
+# files or PostgreSQL hosts. While it is set, request reads of the comments app
+# go to a replica, except for REPLICA_STICKY_SECONDS after the user's last
+# write. The pins live in the REPLICA_PIN_CACHE cache (by default the
+# course_responses cache below), which must be shared between processes, i.e.
+# COURSE_CACHE_BACKEND=file or redis, for them to hold across workers.
+DATABASES.update(replica_configs(DATABASES['default']))
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['comments.routers.PrimaryReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+REPLICA_PIN_CACHE = os.getenv('REPLICA_PIN_CACHE', 'course_responses')
+
+# Caches
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+#
+# 'course_responses' holds the per-course API responses cached by comments/cache.py.
+# COURSE_CACHE_BACKEND selects locmem (default), file or redis; COURSE_CACHE_LOCATION
+# overrides the directory or redis URL.
+#
+# locmem is only right for a single process (runserver, tests). Each process then
+# keeps its own entries and generation counters, so a write handled by one worker
+# does not invalidate what the others cached: they serve stale responses for up
+# to COURSE_CACHE_TIMEOUT seconds, and replica pins do not hold across workers.
+# Deployments with several workers must use file or redis; `manage.py check
+# --deploy` warns otherwise.
+
+COURSE_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'course-responses'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+COURSE_CACHE_BACKEND, COURSE_CACHE_DEFAULT_LOCATION = COURSE_CACHE_BACKENDS[os.getenv('COURSE_CACHE_BACKEND', 'locmem')]
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'course_responses': {
+        'BACKEND': COURSE_CACHE_BACKEND,
+        'LOCATION': os.getenv('COURSE_CACHE_LOCATION', COURSE_CACHE_DEFAULT_LOCATION),
+        'TIMEOUT': int(os.getenv('COURSE_CACHE_TIMEOUT', '300')),
+    },
 }
 
+# Full-text search backend (comments/search.py): FTS5 on SQLite, icontains elsewhere
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', (
+    'comments.search.SQLiteFTS5Backend'
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3'
+    else 'comments.search.DatabaseSearchBackend'
+))
+
+# Password hashing (comments/hashers.py). PASSWORD_HASH_POLICY picks the hasher
+# for new passwords: 'pbkdf2', 'argon2' (needs argon2-cffi) or 'bcrypt' (needs
+# bcrypt). Hashes made under another policy or cost still verify and are
+# rehashed with the current one on the user's next login.
+PASSWORD_HASH_POLICY = os.getenv('PASSWORD_HASH_POLICY', 'pbkdf2')
+PASSWORD_HASHERS = password_hashers(PASSWORD_HASH_POLICY)
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', '600000'))
+PASSWORD_ARGON2_TIME_COST = int(os.getenv('PASSWORD_ARGON2_TIME_COST', '2'))
+PASSWORD_ARGON2_MEMORY_COST = int(os.getenv('PASSWORD_ARGON2_MEMORY_COST', '102400'))  # KiB
+PASSWORD_ARGON2_PARALLELISM = int(os.getenv('PASSWORD_ARGON2_PARALLELISM', '8'))
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv('PASSWORD_BCRYPT_ROUNDS', '12'))
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -121,9 +188,17 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Opt-in fast JSON path: comment and course lists are built from values() rows
+# and rendered with orjson (if installed). The output is byte-identical.
+FAST_JSON = os.getenv('FAST_JSON', '0') == '1'
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'comments.authentication.StatelessJWTAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'comments.renderers.ORJSONRenderer' if FAST_JSON else 'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
 }
 
@@ -135,3 +210,53 @@ AUTH_USER_MODEL = 'comments.CustomUser'
 
 MEDIA_URL = '/media/'  # URL where media files will be served from
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')  # The directory where media files are stored
+
+# Authenticated downloads (comments/downloads.py). Set to 'X-Sendfile' (Apache) or
+# 'X-Accel-Redirect' (nginx) to let the web server stream files; nginx needs an
+# internal location serving MEDIA_ROOT at FILE_DOWNLOAD_ACCEL_REDIRECT_PREFIX.
+FILE_DOWNLOAD_SENDFILE_HEADER = os.getenv('FILE_DOWNLOAD_SENDFILE_HEADER', '')
+FILE_DOWNLOAD_ACCEL_REDIRECT_PREFIX = os.getenv('FILE_DOWNLOAD_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+
+# Store each distinct CourseContent file once, keyed by SHA-256 (comments/storage.py)
+CONTENT_FILE_DEDUP = os.getenv('CONTENT_FILE_DEDUP', '1') == '1'
+
+# Image thumbnails (comments/thumbnails.py): WebP derivatives generated on a
+# background thread pool; THUMBNAIL_WORKERS=0 generates them inline.
+THUMBNAIL_SIZES = {
+    'small': (160, 160),
+    'medium': (480, 480),
+}
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', '2'))
+
+# Resumable uploads (comments/uploads.py): partial files live outside MEDIA_ROOT
+# until the upload is complete and its checksum verified. A session that receives
+# no chunk for CHUNKED_UPLOAD_EXPIRY seconds expires; expired sessions are removed
+# whenever a new one starts, and by manage.py purge_uploads. Each user may have
+# CHUNKED_UPLOAD_MAX_OPEN sessions open at once.
+CHUNKED_UPLOAD_DIR = os.getenv('CHUNKED_UPLOAD_DIR', os.path.join(BASE_DIR, 'uploads'))
+CHUNKED_UPLOAD_MAX_SIZE = int(os.getenv('CHUNKED_UPLOAD_MAX_SIZE', str(4 * 1024 ** 3)))  # 4 GiB per file
+CHUNKED_UPLOAD_MAX_CHUNK = int(os.getenv('CHUNKED_UPLOAD_MAX_CHUNK', str(32 * 1024 ** 2)))  # 32 MiB per PUT
+CHUNKED_UPLOAD_EXPIRY = int(os.getenv('CHUNKED_UPLOAD_EXPIRY', str(24 * 60 * 60)))
+CHUNKED_UPLOAD_MAX_OPEN = int(os.getenv('CHUNKED_UPLOAD_MAX_OPEN', '5'))
+
+# Seconds a process may keep its cached set of alumni emails (comments/alumni.py)
+ALUMNI_CACHE_TIMEOUT = int(os.getenv('ALUMNI_CACHE_TIMEOUT', '300'))
+
+# Read-only requests build request.user from the access token's claims
+# (comments/authentication.py). Whether a user is still active, and staff, is
+# re-checked at most once per JWT_USER_STATE_TTL seconds per process.
+JWT_STATELESS_READS = os.getenv('JWT_STATELESS_READS', '1') == '1'
+JWT_USER_STATE_TTL = int(os.getenv('JWT_USER_STATE_TTL', '60'))
+
+# Live comment feed (comments/live.py). Streams send a keep-alive comment every
+# LIVE_FEED_KEEPALIVE seconds and close after LIVE_FEED_MAX_DURATION, after which
+# EventSource reconnects with Last-Event-ID. A client more than
+# LIVE_FEED_QUEUE_SIZE events behind is disconnected the same way.
+# Serve the feed over ASGI: under WSGI a stream is buffered until it closes and
+# holds a worker thread all the while. Browsers pass ?token= from
+# .../live/token/, which stays valid for LIVE_FEED_TOKEN_LIFETIME seconds.
+LIVE_FEED_KEEPALIVE = float(os.getenv('LIVE_FEED_KEEPALIVE', '15'))
+LIVE_FEED_MAX_DURATION = float(os.getenv('LIVE_FEED_MAX_DURATION', '300'))
+LIVE_FEED_QUEUE_SIZE = int(os.getenv('LIVE_FEED_QUEUE_SIZE', '256'))
+LIVE_FEED_TOKEN_LIFETIME = int(os.getenv('LIVE_FEED_TOKEN_LIFETIME', '60'))
@@ -1,10 +1,18 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from django.views.static import serve
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('comments.urls')),
-]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+
+if settings.DEBUG:
+    # Like static(MEDIA_URL), but images and their thumbnails only: content files
+    # are served by the .../<pk>/download/ routes, which require authentication
+    urlpatterns.append(re_path(
+        rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>(?:thumbnails/[^/]+/)?[^/]+/images/.+)$',
+        serve, {'document_root': settings.MEDIA_ROOT},
+    ))
 
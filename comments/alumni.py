@@ -0,0 +1,61 @@
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Name of the JWT claim LoginView stores the status in
+ALUMNI_CLAIM = 'is_alumni'
+
+_emails = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def alumni_emails():
+    """
+    Return every alumni email as a frozenset, loaded once per process.
+
+    The set is dropped when Alumni rows change in this process (see signals)
+    and reloaded after ALUMNI_CACHE_TIMEOUT seconds, which bounds how stale
+    other processes can be. A set loaded inside a transaction is used but not
+    kept, since the transaction's own changes may yet be rolled back.
+    """
+    global _emails, _loaded_at
+    emails = _emails
+    if emails is not None and time.monotonic() - _loaded_at < settings.ALUMNI_CACHE_TIMEOUT:
+        return emails
+    with _lock:
+        if _emails is not None and time.monotonic() - _loaded_at < settings.ALUMNI_CACHE_TIMEOUT:
+            return _emails
+        Alumni = apps.get_model('comments', 'Alumni')
+        emails = frozenset(Alumni.objects.values_list('email', flat=True))
+        if not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            _emails, _loaded_at = emails, time.monotonic()
+        return emails
+
+
+def is_alumni(email):
+    return email in alumni_emails()
+
+
+def invalidate():
+    global _emails
+    _emails = None
+
+
+def claimed_status(request):
+    """Alumni status from the access token claim, or None if the token has none."""
+    token = getattr(request, 'auth', None)
+    if token is not None and hasattr(token, 'get'):
+        return token.get(ALUMNI_CLAIM)
+    return None
+
+
+def status_for(request):
+    """Alumni status of ``request.user``, from the access token claim when it has one."""
+    claim = claimed_status(request)
+    if claim is not None:
+        return claim
+    return is_alumni(request.user.email)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CommentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'comments'
+
+    def ready(self):
+        from . import signals  # noqa: F401  Connect cache invalidation handlers
+        from . import checks  # noqa: F401  Register system checks
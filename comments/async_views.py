@@ -0,0 +1,190 @@
+"""
+Async counterparts of the read-only views, for deployments served over ASGI.
+
+They return the same JSON as the DRF views at the same paths without the
+``async/`` prefix, and share their response cache. Under ASGI a request waiting
+on the database no longer holds a thread-pool slot. Independent queries are
+issued together with ``asyncio.gather``. Conditional GET (ETag/Last-Modified) is
+left to the sync views, because Django 4.2's ``condition`` decorator is sync only.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.exceptions import APIException, NotAuthenticated
+from rest_framework.renderers import JSONRenderer
+
+from . import alumni, cache, live
+from .authentication import StatelessJWTAuthentication, aauthenticate_live_feed
+from .cache import acache_course_response
+from .models import Comment, Course, Rating, CONTENT_MODELS
+from .pagination import KeysetPagination, astream_json_list, parse_limit_offset
+from .renderers import ORJSONRenderer
+from .serializers import CommentValuesSerializer, ContentValuesSerializer, CourseDetailSerializer
+from .views import COURSE_NOT_FOUND_MESSAGE, STATUS_NOT_FOUND
+
+INVALID_LAST_EVENT_ID_MESSAGE = {"detail": "Last-Event-ID must be a comment id."}
+
+
+async def _fetch(queryset):
+    return [row async for row in queryset]
+
+
+def render(data, status=200, headers=None):
+    renderer = ORJSONRenderer() if settings.FAST_JSON else JSONRenderer()
+    return HttpResponse(renderer.render(data), status=status, content_type='application/json', headers=headers)
+
+
+class AsyncAPIView(View):
+    """
+    Minimal async APIView: JWT authentication, an IsAuthenticated check unless
+    ``authentication_required`` is False, and DRF-style error responses.
+    """
+    http_method_names = ['get', 'head', 'options']
+    authentication_required = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        # Helpers shared with the DRF views (pagination, parse_limit_offset) read query_params
+        request.query_params = request.GET
+        authenticator = StatelessJWTAuthentication()
+        try:
+            if getattr(request, '_force_auth_user', None) is not None:
+                # APIClient.force_authenticate in tests, honoured like DRF's Request does
+                result = request._force_auth_user, getattr(request, '_force_auth_token', None)
+            else:
+                result = await self.authenticate(request, authenticator, **kwargs)
+            if result is None:
+                if self.authentication_required:
+                    raise NotAuthenticated()
+                request.auth = None
+            else:
+                request.user, request.auth = result
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            headers = None
+            if exc.status_code == 401:
+                headers = {'WWW-Authenticate': authenticator.authenticate_header(request)}
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            return render(data, exc.status_code, headers)
+
+    async def authenticate(self, request, authenticator, **kwargs):
+        return await authenticator.aauthenticate(request)
+
+
+class AsyncCourseDetailView(AsyncAPIView):
+    async def get(self, request, course_id):
+        return render(*await self.get_data(request, course_id=course_id))
+
+    @acache_course_response(cache.RESOURCE_DETAIL)
+    async def get_data(self, request, course_id):
+        ratings_limit, ratings_offset = parse_limit_offset(request, 'ratings_limit', 'ratings_offset')
+        context = {
+            'include_ratings': request.query_params.get('ratings') not in ('0', 'false'),
+            'ratings_limit': ratings_limit,
+            'ratings_offset': ratings_offset,
+        }
+        queries = [Course.objects.filter(pk=course_id).afirst()]
+        if context['include_ratings']:
+            ratings = CourseDetailSerializer.ratings_page(Rating.objects.filter(course_id=course_id), context)
+            queries.append(_fetch(ratings))
+        course, *ratings = await asyncio.gather(*queries)
+        if course is None:
+            return COURSE_NOT_FOUND_MESSAGE, STATUS_NOT_FOUND
+        if ratings:
+            context['ratings'] = ratings[0]
+        return CourseDetailSerializer(course, context=context).data, 200
+
+
+class AsyncCommentView(AsyncAPIView):
+    def get_queryset(self, course_id):
+        return (
+            Comment.objects.filter(course_id=course_id)
+            .order_by("-timestamp", "-id")
+            .values(*CommentValuesSerializer.columns)
+        )
+
+    async def get(self, request, course_id):
+        if request.query_params.get("stream") in ("1", "true"):
+            if not await Course.objects.filter(pk=course_id).aexists():
+                return render(COURSE_NOT_FOUND_MESSAGE, STATUS_NOT_FOUND)
+            return astream_json_list(self.get_queryset(course_id), CommentValuesSerializer)
+        return render(*await self.get_data(request, course_id=course_id))
+
+    @acache_course_response(cache.RESOURCE_COMMENTS)
+    async def get_data(self, request, course_id):
+        comments = self.get_queryset(course_id)
+        paginator = KeysetPagination() if KeysetPagination.is_requested(request) else None
+        rows = paginator.apaginate_queryset(comments, request) if paginator else _fetch(comments)
+        exists, rows = await asyncio.gather(Course.objects.filter(pk=course_id).aexists(), rows)
+        if not exists:
+            return COURSE_NOT_FOUND_MESSAGE, STATUS_NOT_FOUND
+
+        data = CommentValuesSerializer(rows).data
+        if paginator is not None:
+            return paginator.get_paginated_data(data), 200
+        if not data:
+            return {"message": "No comments yet."}, 200
+        return data, 200
+
+
+class AsyncCommentFeedView(AsyncAPIView):
+    """
+    New comments on a course as server-sent events (see comments/live.py).
+
+    Browser EventSource cannot send the Bearer header, so besides it the feed
+    accepts ``?token=`` from LiveFeedTokenView, valid for this course only.
+    Once it expires EventSource's reconnects fail with 401, and the client
+    opens a new stream with a fresh token.
+
+    Meant for ASGI: under WSGI Django buffers async streams, so events only
+    arrive when the stream closes after LIVE_FEED_MAX_DURATION, and each open
+    stream holds a worker thread until then.
+    """
+    async def authenticate(self, request, authenticator, **kwargs):
+        if authenticator.get_header(request) is None:
+            return await aauthenticate_live_feed(request, kwargs['course_id'])
+        return await authenticator.aauthenticate(request)
+
+    async def get(self, request, course_id):
+        last_id = request.headers.get("Last-Event-ID") or request.query_params.get("last_id")
+        try:
+            last_id = int(last_id) if last_id else None
+        except ValueError:
+            return render(INVALID_LAST_EVENT_ID_MESSAGE, 400)
+        if not await Course.objects.filter(pk=course_id).aexists():
+            return render(COURSE_NOT_FOUND_MESSAGE, STATUS_NOT_FOUND)
+
+        response = StreamingHttpResponse(live.comment_events(course_id, last_id), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # keep nginx from buffering the stream
+        return response
+
+
+class AsyncCourseContentView(AsyncAPIView):
+    """Lists one CourseContent kind, like CourseContentViewSet.list."""
+    kind = None
+    authentication_required = False
+
+    @property
+    def cache_resource(self):
+        return self.kind
+
+    async def get(self, request, course_id):
+        return render(*await self.get_data(request, course_id=course_id))
+
+    @acache_course_response()
+    async def get_data(self, request, course_id):
+        model = CONTENT_MODELS[self.kind]
+        rows = await _fetch(model.objects.filter(course_id=course_id).values(*ContentValuesSerializer.columns))
+        return ContentValuesSerializer(rows, context={'request': request, 'model': model}).data, 200
+
+
+class AsyncUserStatusView(AsyncAPIView):
+    async def get(self, request):
+        is_alumni = alumni.claimed_status(request)
+        if is_alumni is None:
+            # Older tokens: the alumni set may need loading, which is a sync query
+            is_alumni = await sync_to_async(alumni.is_alumni)(request.user.email)
+        return render({"is_alumni": is_alumni})
@@ -0,0 +1,184 @@
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from . import alumni
+
+# Claims LoginView adds so read requests can be served without loading the user.
+# is_staff is not one of them: permissions must follow a demotion before the token expires.
+USER_CLAIMS = ('email', alumni.ALUMNI_CLAIM)
+MAX_TRACKED_USERS = 10000
+
+# Keeps live feed tokens from being accepted as any other signed value
+LIVE_FEED_TOKEN_SALT = 'comments.live-feed'
+
+# str(user id) -> (is_active, is_staff, checked_at), keyed like the token's user id claim
+_user_states = {}
+_lock = threading.Lock()
+
+
+def add_user_claims(token, user):
+    token['email'] = user.email
+    token[alumni.ALUMNI_CLAIM] = alumni.is_alumni(user.email)
+
+
+def _cached_state(user_id):
+    state = _user_states.get(str(user_id))
+    if state is not None and time.monotonic() - state[2] < settings.JWT_USER_STATE_TTL:
+        return state[:2]
+    return None
+
+
+def _active_users(user_id):
+    User = get_user_model()
+    users = User.objects.filter(pk=user_id)
+    # CustomUser has no is_active column (it is always True), so only deletion revokes it
+    if any(field.name == 'is_active' for field in User._meta.concrete_fields):
+        users = users.filter(is_active=True)
+    return users
+
+
+def user_state(user_id):
+    """
+    ``(is_active, is_staff)`` for ``user_id``: whether it still exists and is
+    active, and whether it is staff now rather than when its token was issued.
+    Checked at most once per JWT_USER_STATE_TTL seconds per process.
+
+    Changes to users saved in this process take effect at once (see signals);
+    other processes notice them within the TTL.
+    """
+    state = _cached_state(user_id)
+    if state is None:
+        is_staff = _active_users(user_id).values_list('is_staff', flat=True).first()
+        state = is_staff is not None, bool(is_staff)
+        set_user_state(user_id, *state)
+    return state
+
+
+async def auser_state(user_id):
+    state = _cached_state(user_id)
+    if state is None:
+        is_staff = await _active_users(user_id).values_list('is_staff', flat=True).afirst()
+        state = is_staff is not None, bool(is_staff)
+        set_user_state(user_id, *state)
+    return state
+
+
+def set_user_state(user_id, active, is_staff=False):
+    with _lock:
+        if len(_user_states) >= MAX_TRACKED_USERS:
+            _user_states.clear()
+        _user_states[str(user_id)] = (active, is_staff, time.monotonic())
+
+
+def revoke(user_id):
+    set_user_state(user_id, False)
+
+
+def forget(user_id):
+    _user_states.pop(str(user_id), None)
+
+
+class ClaimsUser(TokenUser):
+    """
+    Request user built from the access token's claims instead of the database.
+    ``is_staff`` is set from ``user_state`` rather than read from the token.
+    """
+    is_staff = False
+
+    @cached_property
+    def email(self):
+        return self.token['email']
+
+    def is_alumni(self):
+        return self.token[alumni.ALUMNI_CLAIM]
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that skips the user query on read-only requests.
+
+    For GET, HEAD and OPTIONS requests whose token carries USER_CLAIMS, the
+    user is a ClaimsUser, after a check against the cached active and staff
+    state of its id. Writes, and tokens issued without the claims, load the CustomUser
+    as usual. Disabled with JWT_STATELESS_READS=0.
+    """
+    read_only = False
+
+    def authenticate(self, request):
+        # DRF builds authenticators per request, so this does not leak across requests
+        self.read_only = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if not (settings.JWT_STATELESS_READS and self.read_only):
+            return super().get_user(validated_token)
+        if not self.has_user_claims(validated_token):
+            return super().get_user(validated_token)
+
+        user = ClaimsUser(validated_token)
+        active, user.is_staff = user_state(user.id)
+        if not active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
+
+    def has_user_claims(self, validated_token):
+        return all(claim in validated_token for claim in (api_settings.USER_ID_CLAIM, *USER_CLAIMS))
+
+    async def aauthenticate(self, request):
+        """
+        ``authenticate`` for async read-only views. Any database lookup runs
+        off the event loop.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        if settings.JWT_STATELESS_READS and self.has_user_claims(validated_token):
+            user = ClaimsUser(validated_token)
+            active, user.is_staff = await auser_state(user.id)
+            if not active:
+                raise AuthenticationFailed("User is inactive", code="user_inactive")
+            return user, validated_token
+        return await sync_to_async(super().get_user)(validated_token), validated_token
+
+
+def live_feed_token(user_id, course_id):
+    """
+    A token for ``?token=`` on the live feed of ``course_id``: browser
+    EventSource cannot send an Authorization header. It is only valid on that
+    route and course, for LIVE_FEED_TOKEN_LIFETIME seconds, since query strings
+    end up in access logs.
+    """
+    return signing.dumps({'user': user_id, 'course': course_id}, salt=LIVE_FEED_TOKEN_SALT)
+
+
+async def aauthenticate_live_feed(request, course_id):
+    """``(user, None)`` for a valid ``?token=`` from ``live_feed_token``, or None without one."""
+    token = request.GET.get('token')
+    if not token:
+        return None
+    try:
+        claims = signing.loads(token, salt=LIVE_FEED_TOKEN_SALT, max_age=settings.LIVE_FEED_TOKEN_LIFETIME)
+    except signing.BadSignature:
+        raise AuthenticationFailed("Feed token is invalid or expired", code="token_not_valid")
+    if claims.get('course') != course_id:
+        raise AuthenticationFailed("Feed token is for another course", code="token_not_valid")
+    user = await _active_users(claims.get('user')).afirst()
+    if user is None:
+        raise AuthenticationFailed("User is inactive", code="user_inactive")
+    return user, None
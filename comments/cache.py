@@ -0,0 +1,209 @@
+import hashlib
+import threading
+import uuid
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from . import routers
+from .models import Course
+
+CACHE_ALIAS = 'course_responses'
+
+# Resource types cached per course; signals.py maps models onto these
+RESOURCE_DETAIL = 'detail'
+RESOURCE_COMMENTS = 'comments'
+RESOURCE_ASSIGNMENTS = 'assignments'
+RESOURCE_QUIZZES = 'quizzes'
+RESOURCE_PASTPAPERS = 'pastpapers'
+RESOURCE_COURSEMATERIALS = 'coursematerials'
+# These combine the resources above, so they are invalidated together with any of them
+RESOURCE_BUNDLE = 'bundle'
+RESOURCE_CONTENT = 'content'
+AGGREGATE_RESOURCES = {RESOURCE_BUNDLE, RESOURCE_CONTENT}
+RESOURCES = (
+    RESOURCE_DETAIL,
+    RESOURCE_COMMENTS,
+    RESOURCE_ASSIGNMENTS,
+    RESOURCE_QUIZZES,
+    RESOURCE_PASTPAPERS,
+    RESOURCE_COURSEMATERIALS,
+    RESOURCE_BUNDLE,
+    RESOURCE_CONTENT,
+)
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(resource, outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+        _stats[f'{resource}.{outcome}'] += 1
+
+
+def get_stats():
+    with _stats_lock:
+        totals = {outcome: _stats[outcome] for outcome in ('hits', 'misses', 'invalidations')}
+        totals['resources'] = {
+            resource: {outcome: _stats[f'{resource}.{outcome}'] for outcome in ('hits', 'misses', 'invalidations')}
+            for resource in RESOURCES
+        }
+    return totals
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def _generation_key(course_id, resource):
+    return f'course:{course_id}:{resource}:generation'
+
+
+def _generation(cache, course_id, resource):
+    # Entries are keyed by a per-(course, resource) generation token, so
+    # invalidating every cached variant (query strings, pages) is one write.
+    key = _generation_key(course_id, resource)
+    generation = cache.get(key)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        cache.add(key, generation, None)
+        generation = cache.get(key, generation)
+    return generation
+
+
+async def _ageneration(cache, course_id, resource):
+    key = _generation_key(course_id, resource)
+    generation = await cache.aget(key)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        await cache.aadd(key, generation, None)
+        generation = await cache.aget(key, generation)
+    return generation
+
+
+def _response_key(request, course_id, resource, generation, query_string):
+    # Cached data holds absolute URLs (images, files, pages), so each host and
+    # scheme the API is reached through gets its own entry
+    variant = f'{request.scheme}://{request.get_host()}?{query_string}'
+    query = hashlib.md5(variant.encode('utf-8')).hexdigest()
+    return f'course:{course_id}:{resource}:{generation}:{query}'
+
+
+def _version_key(course_id):
+    return f'course:{course_id}:updated_at'
+
+
+def _written_key(course_id):
+    return f'course:{course_id}:written'
+
+
+def _may_store(cache, course_id):
+    # For REPLICA_STICKY_SECONDS after a write a replica may still serve the old
+    # rows, which must not be cached under the generation the write started
+    return not routers.reads_replica() or cache.get(_written_key(course_id)) is None
+
+
+async def _amay_store(cache, course_id):
+    return not routers.reads_replica() or await cache.aget(_written_key(course_id)) is None
+
+
+def get_course_version(course_id):
+    """
+    Return ``Course.updated_at`` for ``course_id``, or None if it does not exist.
+
+    The stamp is cached alongside the responses, so a conditional GET that ends
+    in 304 Not Modified usually costs no database query at all.
+    """
+    cache = caches[CACHE_ALIAS]
+    version = cache.get(_version_key(course_id))
+    if version is None:
+        version = Course.objects.filter(pk=course_id).values_list('updated_at', flat=True).first()
+        if version is not None and _may_store(cache, course_id):
+            cache.set(_version_key(course_id), version)
+    return version
+
+
+def invalidate(course_id, *resources):
+    cache = caches[CACHE_ALIAS]
+    resources = set(resources or RESOURCES) | AGGREGATE_RESOURCES
+    if settings.DATABASE_REPLICAS:
+        # Before the new generations, so whoever sees those also sees this
+        cache.set(_written_key(course_id), True, settings.REPLICA_STICKY_SECONDS)
+    cache.set_many({_generation_key(course_id, resource): uuid.uuid4().hex for resource in resources}, None)
+    cache.delete(_version_key(course_id))
+    for resource in resources:
+        _count(resource, 'invalidations')
+
+
+def clear():
+    caches[CACHE_ALIAS].clear()
+
+
+def cache_course_response(resource=None):
+    """
+    Cache the ``Response.data`` of a ``get``/``list`` handler taking ``course_id``.
+
+    ``resource`` defaults to the view's ``cache_resource`` attribute. Only 200
+    responses built as DRF ``Response`` objects are stored, so error responses
+    and streaming responses always go to the database.
+
+    With read replicas, users pinned to the primary after a write skip the
+    lookup, and replica reads are not stored while a write may still be
+    replicating (see routers.py).
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            cache = caches[CACHE_ALIAS]
+            course_id = kwargs['course_id']
+            resource_name = resource or view.cache_resource
+            generation = _generation(cache, course_id, resource_name)
+            key = _response_key(request, course_id, resource_name, generation, request.query_params.urlencode())
+
+            data = None if routers.is_pinned() else cache.get(key)
+            if data is not None:
+                _count(resource_name, 'hits')
+                return Response(data)
+
+            _count(resource_name, 'misses')
+            response = handler(view, request, *args, **kwargs)
+            if isinstance(response, Response) and response.status_code == 200 and _may_store(cache, course_id):
+                cache.set(key, response.data)
+            return response
+        return wrapper
+    return decorator
+
+
+def acache_course_response(resource=None):
+    """
+    ``cache_course_response`` for the async views in async_views.py.
+
+    Handlers return ``(data, status)``; entries are shared with the sync views,
+    so either kind of view can serve what the other cached.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        async def wrapper(view, request, *args, **kwargs):
+            cache = caches[CACHE_ALIAS]
+            course_id = kwargs['course_id']
+            resource_name = resource or view.cache_resource
+            generation = await _ageneration(cache, course_id, resource_name)
+            key = _response_key(request, course_id, resource_name, generation, request.GET.urlencode())
+
+            data = None if await routers.ais_pinned() else await cache.aget(key)
+            if data is not None:
+                _count(resource_name, 'hits')
+                return data, 200
+
+            _count(resource_name, 'misses')
+            data, status = await handler(view, request, *args, **kwargs)
+            if status == 200 and await _amay_store(cache, course_id):
+                await cache.aset(key, data)
+            return data, status
+        return wrapper
+    return decorator
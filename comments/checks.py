@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PER_PROCESS_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@register(Tags.caches, deploy=True)
+def check_course_cache_is_shared(app_configs, **kwargs):
+    # Invalidation bumps a generation in the course cache; in a per-process cache
+    # the other workers never see it (see CACHES in settings)
+    if settings.CACHES['course_responses']['BACKEND'] != PER_PROCESS_CACHE:
+        return []
+    return [Warning(
+        "The course_responses cache is per process, so other workers keep serving "
+        "responses a write invalidated until COURSE_CACHE_TIMEOUT.",
+        hint="Set COURSE_CACHE_BACKEND=file or redis when running more than one worker.",
+        id='comments.W001',
+    )]
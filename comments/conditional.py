@@ -0,0 +1,41 @@
+import hashlib
+
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from . import routers
+from .cache import get_course_version
+
+
+def _course_etag(request, *args, course_id, **kwargs):
+    if routers.is_pinned():
+        return None
+    updated_at = get_course_version(course_id)
+    if updated_at is None:
+        return None
+    # The same version renders differently per page and options (path and query
+    # string), per negotiated renderer, and per host and scheme in absolute URLs.
+    # DRF has negotiated the renderer by the time the view method runs.
+    renderer = getattr(request, 'accepted_renderer', None)
+    tag = '|'.join([
+        updated_at.isoformat(),
+        request.scheme,
+        request.get_host(),
+        request.get_full_path(),
+        getattr(renderer, 'format', ''),
+        getattr(request, 'accepted_media_type', ''),
+    ])
+    return hashlib.md5(tag.encode('utf-8')).hexdigest()
+
+
+def _course_last_modified(request, *args, course_id, **kwargs):
+    if routers.is_pinned():
+        return None
+    return get_course_version(course_id)
+
+
+# Answers GET/HEAD with 304 Not Modified when If-None-Match / If-Modified-Since
+# still match the course's updated_at, before the view touches any child table.
+# Users pinned to the primary after a write always get a full response, since
+# the cached stamp may have been read from a lagging replica.
+course_condition = method_decorator(condition(etag_func=_course_etag, last_modified_func=_course_last_modified))
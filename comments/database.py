@@ -0,0 +1,14 @@
+"""
+Per-connection SQLite tuning: runs the PRAGMAS that comment_system/database.py
+puts in each SQLite DATABASES entry when a connection opens.
+"""
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """connection_created handler running the connection's PRAGMAS."""
+    pragmas = connection.settings_dict.get('PRAGMAS')
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    # On the raw connection, so the statements stay out of query logs and budgets
+    for name, value in pragmas.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
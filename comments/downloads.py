@@ -0,0 +1,129 @@
+import hashlib
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import content_disposition_header, parse_etags
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def download_url(request, model, pk):
+    """
+    URL of the download route of content row ``pk``, which checks authentication
+    and names the file, so API responses never link to MEDIA_URL directly.
+    """
+    url = reverse(f'{model._meta.model_name}-download', args=[pk])
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def _etag(path, stat):
+    tag = f'{path}|{stat.st_size}|{stat.st_mtime_ns}'
+    return '"%s"' % hashlib.md5(tag.encode('utf-8')).hexdigest()
+
+
+def _parse_range(header, size):
+    """
+    Return ``(start, end)`` (inclusive) for a single ``bytes=`` range.
+
+    Returns None for headers we do not handle, such as multiple ranges, in
+    which case the whole file is sent, as RFC 9110 allows.
+    """
+    match = RANGE_HEADER.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if start == '':
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def _read_range(path, start, end, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = handle.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _sendfile_response(field_file, filename):
+    # Let the front-end web server stream the file; it handles ranges itself
+    header = settings.FILE_DOWNLOAD_SENDFILE_HEADER
+    response = HttpResponse(content_type='')
+    if header == 'X-Accel-Redirect':
+        response[header] = settings.FILE_DOWNLOAD_ACCEL_REDIRECT_PREFIX + field_file.name
+    else:
+        response[header] = field_file.path
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
+
+
+def file_download_response(request, field_file, filename=None):
+    """
+    Stream ``field_file`` in chunks, honouring ``Range`` and ``If-None-Match``.
+
+    Only single byte ranges are served as 206; anything else falls back to the
+    full file. With ``FILE_DOWNLOAD_SENDFILE_HEADER`` set the transfer is
+    handed to the web server instead. ``filename`` is offered to the client and
+    defaults to the file's own.
+    """
+    filename = filename or os.path.basename(field_file.name)
+    if settings.FILE_DOWNLOAD_SENDFILE_HEADER:
+        return _sendfile_response(field_file, filename)
+
+    path = field_file.path
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = _etag(field_file.name, stat)
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match)):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    # A stale If-Range validator means the client's partial copy is outdated: send everything
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename)
+        response.block_size = DOWNLOAD_CHUNK_SIZE
+    else:
+        start, end = byte_range
+        content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = StreamingHttpResponse(_read_range(path, start, end), status=206, content_type=content_type)
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    return response
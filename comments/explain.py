@@ -0,0 +1,55 @@
+"""
+Query plan inspection for the audit_indexes command.
+
+``full_scans`` runs EXPLAIN for one SELECT and returns the tables it reads in
+full while filtering them, which usually means a filter with no index to use.
+Unfiltered scans (a complete list, the alumni set) are expected and ignored.
+SQLite and PostgreSQL are supported.
+"""
+import json
+import re
+
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(?P<table>\w+)(?: AS \w+)?$')
+WHERE = re.compile(r'\bWHERE\b', re.IGNORECASE)
+
+
+def is_supported(connection):
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def full_scans(connection, sql, params):
+    """Return ``(table, plan line)`` for each filtered full table scan in the plan."""
+    if connection.vendor == 'sqlite':
+        return _sqlite_full_scans(connection, sql, params)
+    if connection.vendor == 'postgresql':
+        return _postgresql_full_scans(connection, sql, params)
+    raise NotImplementedError(f"EXPLAIN is not supported on {connection.vendor}")
+
+
+def _sqlite_full_scans(connection, sql, params):
+    if not WHERE.search(sql):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        plan = [row[-1] for row in cursor.fetchall()]
+    # "SCAN t USING INDEX i" walks an index and "SCAN t VIRTUAL TABLE" is FTS; neither is flagged
+    return [(match['table'], line) for line in plan if (match := SQLITE_SCAN.match(line))]
+
+
+def _postgresql_full_scans(connection, sql, params):
+    with connection.cursor() as cursor:
+        # Tiny tables are scanned whatever their indexes, so ask whether an index could be used at all
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    scans = []
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        nodes.extend(node.get('Plans', ()))
+        if node['Node Type'] == 'Seq Scan' and 'Filter' in node:
+            scans.append((node['Relation Name'], f"Seq Scan on {node['Relation Name']} (Filter: {node['Filter']})"))
+    return scans
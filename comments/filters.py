@@ -0,0 +1,52 @@
+from django.db.models import ExpressionWrapper, F, FloatField, Value
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+
+def _parse_moment(value, param):
+    moment = parse_datetime(value) or parse_date(value)
+    if moment is None:
+        raise ValidationError({param: "Use an ISO 8601 date or datetime."})
+    return moment
+
+
+class CourseFilterBackend(BaseFilterBackend):
+    """
+    Catalog filters: ``created_after``/``created_before`` (ISO dates),
+    ``title`` (case-insensitive prefix) and ``min_rating`` (average, 1-5).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        if 'created_after' in params:
+            queryset = queryset.filter(created_at__gte=_parse_moment(params['created_after'], 'created_after'))
+        if 'created_before' in params:
+            queryset = queryset.filter(created_at__lt=_parse_moment(params['created_before'], 'created_before'))
+        if params.get('title'):
+            queryset = queryset.filter(title__istartswith=params['title'])
+        if 'min_rating' in params:
+            try:
+                min_rating = float(params['min_rating'])
+            except ValueError:
+                raise ValidationError({'min_rating': "Must be a number."})
+            # average >= min  <=>  sum >= min * count, evaluated on the counter columns
+            queryset = queryset.filter(
+                rating_count__gt=0,
+                rating_sum__gte=ExpressionWrapper(F('rating_count') * Value(min_rating), output_field=FloatField()),
+            )
+        return queryset
+
+
+class StableOrderingFilter(OrderingFilter):
+    """
+    ``OrderingFilter`` ending every ordering with ``id``, so rows with equal
+    values keep one order and cursor/offset pages neither repeat nor skip them.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering = [*ordering, 'id']
+        return ordering
@@ -0,0 +1,138 @@
+"""
+Live comment feed: new comments pushed to clients as server-sent events.
+
+A client opens one long-lived stream per course instead of polling the
+comment list. A save publishes the comment once to the in-process hub, which
+fans it out to every stream open on that course. Reconnecting clients send
+Last-Event-ID (or ``?last_id=``) and first get the comments they missed from
+the database, so nothing is lost across reconnects, restarts or processes
+the hub does not reach.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+from .models import Comment
+from .renderers import ORJSONRenderer
+from .serializers import CommentValuesSerializer
+
+# Milliseconds EventSource waits before reconnecting
+RETRY_MS = 2000
+
+
+class Subscription:
+    """One client's queue of ``(comment_id, payload)`` events, owned by its event loop."""
+
+    def __init__(self, course_id):
+        self.course_id = course_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=settings.LIVE_FEED_QUEUE_SIZE)
+
+    def deliver(self, event):
+        # Runs on the subscriber's loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind: end the stream; the client resumes from the database with Last-Event-ID
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class CommentHub:
+    """
+    In-process pub/sub for new comments.
+
+    Each new comment is serialized and rendered once and then handed to every
+    subscriber of its course. Subscribers live on event loops (the async feed
+    view), while publishing happens in whichever thread saved the comment.
+    The hub only reaches clients connected to this process; the feed's
+    Last-Event-ID replay covers anything a client missed.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, course_id):
+        subscription = Subscription(course_id)
+        with self._lock:
+            self._subscribers[course_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.course_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.course_id]
+
+    def has_subscribers(self, course_id):
+        return course_id in self._subscribers
+
+    def publish(self, course_id, comment_id, payload):
+        with self._lock:
+            subscribers = list(self._subscribers.get(course_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, (comment_id, payload))
+            except RuntimeError:
+                self.unsubscribe(subscription)  # its loop has closed
+
+
+hub = CommentHub()
+
+
+def render_event(data):
+    renderer = ORJSONRenderer() if settings.FAST_JSON else JSONRenderer()
+    return renderer.render(data).decode('utf-8')
+
+
+def format_event(comment_id, payload):
+    return f'id: {comment_id}\nevent: comment\ndata: {payload}\n\n'
+
+
+async def comment_events(course_id, last_id=None):
+    """
+    Yield the SSE stream for ``course_id``: comments after ``last_id`` from the
+    database, then new comments as they are published.
+    """
+    # Subscribe before reading the backlog so no comment falls in between
+    subscription = hub.subscribe(course_id)
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        replayed = set()
+        if last_id is not None:
+            serializer = CommentValuesSerializer(
+                Comment.objects.filter(course_id=course_id, id__gt=last_id).order_by('id')
+            )
+            async for row in serializer.rows().aiterator():
+                replayed.add(row['id'])
+                yield format_event(row['id'], render_event(serializer.to_representation(row)))
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.LIVE_FEED_MAX_DURATION
+        while True:
+            timeout = min(settings.LIVE_FEED_KEEPALIVE, deadline - loop.time())
+            try:
+                event = await asyncio.wait_for(subscription.get(), max(timeout, 0))
+            except asyncio.TimeoutError:
+                if loop.time() >= deadline:
+                    return
+                yield ': keep-alive\n\n'
+                continue
+            if event is None:
+                return  # fell behind; the client resumes from its Last-Event-ID
+            comment_id, payload = event
+            if comment_id in replayed or (last_id is not None and comment_id <= last_id):
+                continue
+            yield format_event(comment_id, payload)
+    finally:
+        hub.unsubscribe(subscription)
@@ -0,0 +1,168 @@
+import logging
+import re
+import uuid
+from collections import defaultdict
+from contextlib import ExitStack
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import override_settings
+from django.urls import URLResolver
+from rest_framework.test import APIClient
+
+from comments import explain
+from comments.models import Alumni, Comment, Course, CustomUser, Rating, UploadSession, CONTENT_MODELS
+from comments.urls import urlpatterns
+
+URL_PREFIX = '/api/'
+ROUTE_PARAMETER = re.compile(r'<(?:\w+:)?(\w+)>|\(\?P<(\w+)>[^)]*\)')
+# Query strings that reach querysets a bare GET does not; paginated responses are followed to their next page
+QUERY_STRINGS = {
+    'comments/course/<int:course_id>/': [{'page_size': 1}],
+    'course/<int:course_id>/': [{'ratings_limit': 1}],
+    'search/': [{'q': 'audit'}],
+    '^courses/$': [{'created_after': '2000-01-01T00:00:00Z'}, {'ordering': '-created_at', 'page_size': 1}],
+}
+# (route, query parameter, table) scans that are accepted; add an entry only with the reason
+ALLOWED_SCANS = {
+    # Not fixed by course_created_at_idx: created_after/created_before keep the default id
+    # order, and SQLite prefers walking the table in id order to sorting what the index finds.
+    # The index only serves these filters combined with ?ordering=created_at.
+    ('^courses/$', 'created_after', 'comments_course'),
+}
+NO_RESPONSE_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'course_responses': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+def iter_routes(patterns, prefix=''):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_routes(pattern.url_patterns, prefix + str(pattern.pattern))
+        elif 'format>' not in str(pattern.pattern):  # DRF format-suffix duplicates
+            yield prefix + str(pattern.pattern)
+
+
+class Command(BaseCommand):
+    help = (
+        'GET every API route against sample rows (rolled back afterwards), EXPLAIN each SELECT '
+        'it runs and flag filtered full table scans, i.e. filters no index serves'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fail', action='store_true', help='Exit with an error when a scan is flagged')
+        parser.add_argument('--verbose-sql', action='store_true', help='Print the SQL of flagged queries')
+
+    def handle(self, *args, **options):
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)  # 404/405 from routes that take no GET are expected
+        try:
+            with transaction.atomic(), override_settings(ALLOWED_HOSTS=['testserver'], CACHES=NO_RESPONSE_CACHE):
+                queries = self.capture(self.seed())
+                findings = self.audit(queries)
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            request_logger.setLevel(level)
+
+        checked = sum(len(statements) for statements in queries.values())
+        scans = allowed = 0
+        for (route, path), found in findings.items():
+            self.stdout.write(f'GET {path}')
+            params = parse_qs(urlsplit(path).query)
+            for table, line, sql in found:
+                if any((route, param, table) in ALLOWED_SCANS for param in params):
+                    allowed += 1
+                    self.stdout.write(f'  allowed full scan of {table}: {line}')
+                else:
+                    scans += 1
+                    self.stdout.write(f'  full scan of {table}: {line}')
+                if options['verbose_sql']:
+                    self.stdout.write(f'    {sql}')
+        self.stdout.write(
+            f'{checked} queries over {len(queries)} requests, '
+            f'{scans} filtered full table scan(s), {allowed} allowed'
+        )
+        if scans and options['fail']:
+            raise CommandError(f'{scans} query plan(s) scan a whole table to filter it')
+
+    def seed(self):
+        user = CustomUser.objects.create_user(email=f'audit-{uuid.uuid4().hex[:12]}@example.com', password=None)
+        user.is_staff = True
+        user.save()
+        course, other = (Course.objects.create(title=f'Audit course {index}') for index in range(2))
+        for index in range(2):
+            Comment.objects.create(user=user, course=course, text=f'Audit comment {index}')
+        Rating.objects.create(user=user, course=course, rating=5)
+        Rating.objects.create(user=user, course=other, rating=3)
+        Alumni.objects.get_or_create(email='l000000@lhr.nu.edu.pk')
+        samples = {kind: model.objects.create(course=course, title=f'Audit {kind}') for kind, model in CONTENT_MODELS.items()}
+        samples['course'] = course
+        samples['upload'] = UploadSession.objects.create(
+            user=user, course=course, kind='assignments', title='Audit upload', filename='audit.pdf',
+            size=1, sha256='0' * 64,
+        )
+        samples['user'] = user
+        return samples
+
+    def build_path(self, route, samples):
+        prefix = route.lstrip('^').split('/', 1)[0]
+
+        def value(match):
+            name = match.group(1) or match.group(2)
+            if name == 'upload_id':
+                return str(samples['upload'].pk)
+            if name == 'pk' and prefix in CONTENT_MODELS:
+                return str(samples[prefix].pk)
+            return str(samples['course'].pk)
+
+        return URL_PREFIX + ROUTE_PARAMETER.sub(value, route).strip('^$')
+
+    def capture(self, samples):
+        """Return ``{(route, request): [(connection, sql, params)]}`` of the distinct SELECTs each GET ran."""
+        client = APIClient()
+        client.force_authenticate(samples['user'])
+        queries = defaultdict(dict)
+        current = []
+
+        def record(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+                queries[current[0]].setdefault(sql, (context['connection'], sql, params))
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(record))
+            for route in iter_routes(urlpatterns):
+                path = self.build_path(route, samples)
+                for params in [{}, *QUERY_STRINGS.get(route, [])]:
+                    current[:] = [(route, f'{path}?{urlencode(params)}' if params else path)]
+                    response = client.get(path, params)
+                    next_link = response.get('Content-Type') == 'application/json' and self.next_link(response)
+                    if next_link:
+                        current[:] = [(route, next_link.split('testserver', 1)[-1])]
+                        client.get(next_link)
+        return {request: list(statements.values()) for request, statements in queries.items()}
+
+    def next_link(self, response):
+        data = response.json()
+        return data.get('next') if isinstance(data, dict) else None
+
+    def audit(self, queries):
+        findings = {}
+        for request, statements in queries.items():
+            found = []
+            for connection, sql, params in statements:
+                if explain.is_supported(connection):
+                    found.extend((table, line, sql) for table, line in explain.full_scans(connection, sql, params))
+            if found:
+                findings[request] = found
+        return findings
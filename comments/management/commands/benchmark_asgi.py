@@ -0,0 +1,171 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from comments.authentication import add_user_claims
+from comments.models import Comment, Course, CustomUser, Quizz
+
+HOST = 'localhost'
+# Read paths compared; the async ones live under api/async/
+ROUTES = (
+    'course/{course_id}/',
+    'comments/course/{course_id}/',
+    'courses/{course_id}/quizzes/',
+    'user/status/',
+)
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'course_responses': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare requests/s and latency of the read paths under WSGI (sync views, a bounded '
+        'thread pool) and ASGI (async views on one event loop), driving both handlers in-process '
+        'with many concurrent clients'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=500, help='Concurrent clients')
+        parser.add_argument('--requests', type=int, default=4, help='Requests per client and mode')
+        parser.add_argument('--wsgi-threads', type=int, default=32,
+                            help='Requests WSGI serves at once, like a threaded worker pool')
+        parser.add_argument('--comments', type=int, default=200, help='Comments on the benchmark course')
+        parser.add_argument('--cache', action='store_true', help='Keep the course response cache enabled')
+        parser.add_argument('--asgi-sync', action='store_true',
+                            help='Also measure the sync views under ASGI (they run in a thread)')
+
+    def handle(self, *args, **options):
+        user, course, token = self.seed(options['comments'])
+        overrides = {'ALLOWED_HOSTS': [HOST]}
+        if not options['cache']:
+            overrides['CACHES'] = NO_CACHE
+        try:
+            with override_settings(**overrides):
+                paths = [f'/api/{route.format(course_id=course.pk)}' for route in ROUTES]
+                async_paths = [path.replace('/api/', '/api/async/', 1) for path in paths]
+                self.report('WSGI, sync views', self.run_wsgi(paths, token, options))
+                self.report('ASGI, async views', self.run_asgi(async_paths, token, options))
+                if options['asgi_sync']:
+                    self.report('ASGI, sync views', self.run_asgi(paths, token, options))
+        finally:
+            course.delete()
+            user.delete()
+
+    def seed(self, comments):
+        user = CustomUser.objects.create_user(email='benchmark-asgi@example.com', password=None)
+        course = Course.objects.create(title='ASGI benchmark', description='Benchmark course')
+        Comment.objects.bulk_create(
+            Comment(user=user, course=course, text=f'Benchmark comment {index}') for index in range(comments)
+        )
+        Quizz.objects.bulk_create(Quizz(course=course, title=f'Quizz {index}') for index in range(10))
+        access = RefreshToken.for_user(user).access_token
+        add_user_claims(access, user)  # as LoginView does
+        return user, course, str(access)
+
+    def report(self, label, result):
+        latencies, elapsed, errors = result
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f'{label}: {len(latencies) / elapsed:.0f} req/s, p50 {statistics.median(latencies) * 1000:.1f} ms, '
+            f'p99 {p99 * 1000:.1f} ms, {errors} error(s) over {len(latencies)} requests'
+        )
+
+    def run_wsgi(self, paths, token, options):
+        handler = WSGIHandler()
+        # Worker threads with a FIFO queue in front, as behind a threaded WSGI server
+        workers = ThreadPoolExecutor(max_workers=options['wsgi_threads'])
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def serve(path):
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+                'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'HTTP_HOST': HOST, 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_AUTHORIZATION': f'Bearer {token}', 'wsgi.input': BytesIO(), 'wsgi.url_scheme': 'http',
+                'wsgi.errors': BytesIO(), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+                'wsgi.run_once': False, 'wsgi.version': (1, 0),
+            }
+            status = []
+            body = handler(environ, lambda code, headers, exc_info=None: status.append(code))
+            try:
+                b''.join(body)
+            finally:
+                body.close()
+            return status[0]
+
+        def client(number):
+            for index in range(options['requests']):
+                started = time.perf_counter()
+                status = workers.submit(serve, paths[(number + index) % len(paths)]).result()
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+                    if not status.startswith('200'):
+                        errors.append(status)
+
+        threads = [threading.Thread(target=client, args=(number,)) for number in range(options['clients'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        workers.shutdown()
+        return latencies, elapsed, len(errors)
+
+    def run_asgi(self, paths, token, options):
+        handler = ASGIHandler()
+        latencies, errors = [], []
+
+        async def request(path):
+            status = []
+            done = asyncio.Event()
+            messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                await done.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+                elif not message.get('more_body'):
+                    done.set()
+
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '', 'query_string': b'',
+                'headers': [(b'host', HOST.encode()), (b'authorization', f'Bearer {token}'.encode())],
+                'server': (HOST, 80), 'client': ('127.0.0.1', 50000),
+            }
+            await handler(scope, receive, send)
+            return status[0]
+
+        async def client(number):
+            for index in range(options['requests']):
+                started = time.perf_counter()
+                status = await request(paths[(number + index) % len(paths)])
+                latencies.append(time.perf_counter() - started)
+                if status != 200:
+                    errors.append(status)
+
+        async def run():
+            started = time.perf_counter()
+            await asyncio.gather(*(client(number) for number in range(options['clients'])))
+            return time.perf_counter() - started
+
+        elapsed = asyncio.run(run())
+        return latencies, elapsed, len(errors)
@@ -0,0 +1,139 @@
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+
+from comment_system.database import SQLITE_DEFAULT_PRAGMAS, SQLITE_TUNED_PRAGMAS, sqlite_database
+from comments.models import Comment, Course, CustomUser
+
+PROFILES = {
+    'default': SQLITE_DEFAULT_PRAGMAS,
+    'tuned': SQLITE_TUNED_PRAGMAS,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare concurrent comment/rating writes on a scratch SQLite file with Django\'s default '
+        'settings and with the tuned profile (WAL, busy_timeout, synchronous=NORMAL, mmap)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='Concurrent writer threads')
+        parser.add_argument('--readers', type=int, default=4, help='Threads listing comments meanwhile')
+        parser.add_argument('--writes', type=int, default=200, help='Writes per writer')
+        parser.add_argument('--profiles', default=','.join(PROFILES), help='Comma-separated profiles to run')
+
+    def handle(self, *args, **options):
+        profiles = options['profiles'].split(',')
+        unknown = [profile for profile in profiles if profile not in PROFILES]
+        if unknown:
+            raise CommandError(f"Unknown profile(s): {', '.join(unknown)}")
+
+        directory = tempfile.mkdtemp(prefix='benchmark-db-')
+        try:
+            for profile in profiles:
+                alias = f'benchmark_{profile}'
+                config = sqlite_database(str(Path(directory) / f'{profile}.sqlite3'), PROFILES[profile])
+                connections.settings[alias] = connections.configure_settings({'default': config})['default']
+                try:
+                    call_command('migrate', database=alias, verbosity=0)
+                    self.report(profile, self.run(alias, options))
+                finally:
+                    connections[alias].close()
+                    del connections[alias]  # a later run must not reuse it with this run's file
+                    del connections.settings[alias]
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def report(self, profile, result):
+        latencies, elapsed, errors, reads = result
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0
+        median = statistics.median(latencies) if latencies else 0
+        self.stdout.write(
+            f'{profile}: {len(latencies) / elapsed:.0f} writes/s, p50 {median * 1000:.1f} ms, '
+            f'p99 {p99 * 1000:.1f} ms, {errors} locked error(s), {reads} concurrent reads'
+        )
+
+    def run(self, alias, options):
+        # bulk_create throughout: the model signals (search index, cache) write to the default database
+        user = CustomUser(email='benchmark-db@example.com')
+        user.set_unusable_password()
+        user, = CustomUser.objects.using(alias).bulk_create([user])
+        course, = Course.objects.using(alias).bulk_create([Course(title='Write benchmark', description='Benchmark course')])
+        latencies, errors, reads, failures = [], [], [], []
+        lock = threading.Lock()
+        writing = threading.Event()
+        writing.set()
+
+        def write():
+            # Write-first like CourseDetailView.post: bump the counters, then insert
+            with transaction.atomic(using=alias):
+                Course.objects.using(alias).filter(pk=course.pk).update(
+                    rating_sum=F('rating_sum') + 4, rating_count=F('rating_count') + 1,
+                )
+                Comment.objects.using(alias).bulk_create([Comment(user=user, course=course, text='Benchmark')])
+
+        def writer():
+            try:
+                for _ in range(options['writes']):
+                    started = time.perf_counter()
+                    try:
+                        write()
+                    except OperationalError as exc:
+                        if 'locked' not in str(exc):
+                            raise
+                        with lock:
+                            errors.append(exc)
+                        continue
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+            except Exception as exc:
+                with lock:
+                    failures.append(exc)
+            finally:
+                connections[alias].close()
+
+        def reader():
+            count = 0
+            try:
+                while writing.is_set():
+                    try:
+                        list(Comment.objects.using(alias).filter(course=course).order_by('-timestamp', '-id')[:50])
+                        count += 1
+                    except OperationalError as exc:
+                        if 'locked' not in str(exc):
+                            raise
+                        with lock:
+                            errors.append(exc)
+            except Exception as exc:
+                with lock:
+                    failures.append(exc)
+            finally:
+                connections[alias].close()
+                with lock:
+                    reads.append(count)
+
+        writers = [threading.Thread(target=writer) for _ in range(options['writers'])]
+        readers = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        started = time.perf_counter()
+        for thread in writers + readers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        writing.clear()
+        for thread in readers:
+            thread.join()
+        if failures:
+            # Anything but lock contention means the numbers above would be meaningless
+            raise CommandError(f'{len(failures)} benchmark thread(s) failed: {failures[0]!r}') from failures[0]
+        return latencies, elapsed, len(errors), sum(reads)
@@ -0,0 +1,78 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from comments.models import Comment, Course, CustomUser
+from comments.renderers import ORJSONRenderer, orjson
+from comments.serializers import CommentSerializer, CommentValuesSerializer, CourseSerializer, CourseValuesSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the default and FAST_JSON serialization paths for comment and course lists, '
+        'checking that both render byte-identical JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000,
+                            help='Synthetic comments and courses to add for the run (rolled back afterwards)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per path; the best is reported')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write('orjson is not installed; the fast path is timed with the standard renderer')
+        try:
+            with transaction.atomic():
+                self.seed(options['rows'])
+                self.compare('comments', Comment.objects.select_related('user', 'course').order_by('-timestamp', '-id'),
+                             CommentSerializer, CommentValuesSerializer, options['repeat'])
+                self.compare('courses', Course.objects.order_by('id'),
+                             CourseSerializer, CourseValuesSerializer, options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, rows):
+        if rows <= 0:
+            return
+        user = CustomUser.objects.create_user(email='benchmark-json@example.com', password=None)
+        courses = Course.objects.bulk_create(
+            Course(title=f'Benchmark course {index} – ünïcode', description='Line separated "text"',
+                   rating_sum=index % 23, rating_count=index % 5)
+            for index in range(rows)
+        )
+        Comment.objects.bulk_create(
+            Comment(user=user, course=courses[index % len(courses)], text=f'Comment {index} with é and \\ and "')
+            for index in range(rows)
+        )
+
+    def compare(self, label, queryset, serializer_class, values_serializer_class, repeat):
+        def default():
+            return JSONRenderer().render(serializer_class(queryset, many=True).data)
+
+        def fast():
+            return ORJSONRenderer().render(values_serializer_class(queryset, many=True).data)
+
+        default_time, expected = self.best_of(default, repeat)
+        fast_time, actual = self.best_of(fast, repeat)
+        if actual != expected:
+            raise CommandError(f'{label}: the fast path rendered different JSON')
+        self.stdout.write(
+            f'{label}: {len(expected)} bytes, default {default_time * 1000:.1f} ms, '
+            f'fast {fast_time * 1000:.1f} ms ({default_time / fast_time:.1f}x), output identical'
+        )
+
+    def best_of(self, render, repeat):
+        best = None
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            output = render()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, output
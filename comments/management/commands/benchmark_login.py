@@ -0,0 +1,73 @@
+import time
+
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from comment_system import passwords
+
+PASSWORD = 'benchmark-Passw0rd!'
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure signup/ and login/ throughput under each password hashing policy. '
+        'Requests run one at a time in this process, so the rates are per core.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='Accounts to sign up and log in per policy')
+        parser.add_argument(
+            '--policies', default='pbkdf2,pbkdf2-tuned,argon2,bcrypt',
+            help="Comma-separated policies; 'pbkdf2-tuned' is pbkdf2 with --pbkdf2-iterations",
+        )
+        parser.add_argument('--pbkdf2-iterations', type=int, default=100000)
+
+    def handle(self, *args, **options):
+        for label in options['policies'].split(','):
+            policy, _, variant = label.partition('-')
+            if policy not in passwords.POLICIES:
+                raise CommandError(f'Unknown policy {label!r}; choose from {", ".join(passwords.POLICIES)}')
+            overrides = {'PASSWORD_HASHERS': passwords.password_hashers(policy)}
+            if variant == 'tuned':
+                overrides['PASSWORD_PBKDF2_ITERATIONS'] = options['pbkdf2_iterations']
+
+            with override_settings(ALLOWED_HOSTS=['testserver'], **overrides):
+                hasher = get_hasher()
+                try:
+                    if hasher.library:
+                        hasher._load_library()
+                except ValueError as error:
+                    self.stderr.write(f'{label}: skipped ({error})')
+                    continue
+                signups, logins = self.run_policy(options['users'])
+            self.stdout.write(f'{label}: {signups:.1f} signups/s, {logins:.1f} logins/s per core')
+
+    def run_policy(self, users):
+        client = APIClient()
+        emails = [f'benchmark-login-{index}@example.com' for index in range(users)]
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                for email in emails:
+                    response = client.post('/api/signup/', {'email': email, 'password': PASSWORD})
+                    if response.status_code != 201:
+                        raise CommandError(f'signup failed: {response.content!r}')
+                signup_time = time.perf_counter() - started
+
+                started = time.perf_counter()
+                for email in emails:
+                    response = client.post('/api/login/', {'email': email, 'password': PASSWORD})
+                    if response.status_code != 200:
+                        raise CommandError(f'login failed: {response.content!r}')
+                login_time = time.perf_counter() - started
+                raise Rollback
+        except Rollback:
+            pass
+        return users / signup_time, users / login_time
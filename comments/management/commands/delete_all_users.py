@@ -1,9 +1,44 @@
 from django.core.management.base import BaseCommand
-from authapp.models import CustomUser  # Adjust according to the actual location of CustomUser
+from comments import cache
+from comments.models import Course, CustomUser
+
+USER_DELETE_BATCH_SIZE = 500
+
 
 class Command(BaseCommand):
     help = 'Delete all users from the database'
 
-    def handle(self, *args, **kwargs):
-        CustomUser.objects.all().delete()
-        self.stdout.write(self.style.SUCCESS('Successfully deleted all users'))
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=USER_DELETE_BATCH_SIZE,
+            help='Users deleted per query batch; only one batch of ids is held in memory',
+        )
+        parser.add_argument(
+            '--keep-staff',
+            action='store_true',
+            help='Keep staff and superuser accounts',
+        )
+
+    def handle(self, *args, **options):
+        users = CustomUser.objects.order_by('pk')
+        if options['keep_staff']:
+            users = users.filter(is_staff=False, is_superuser=False)
+
+        deleted = 0
+        while True:
+            pks = list(users.values_list('pk', flat=True)[:options['batch_size']])
+            if not pks:
+                break
+            # Model delete, so comments, ratings and uploads cascade and their signals run
+            CustomUser.objects.filter(pk__in=pks).delete()
+            deleted += len(pks)
+
+        if deleted:
+            # Cascaded rating deletes do not adjust the denormalized counters
+            if Course.objects.with_drifted_rating_counters().exists():
+                Course.objects.rebuild_rating_counters()
+                Course.objects.touch()
+                cache.clear()
+        self.stdout.write(self.style.SUCCESS(f'Successfully deleted {deleted} user(s)'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from comments.models import Course, CONTENT_MODELS
+from comments.thumbnails import generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Generate missing WebP thumbnails for course and course content images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--overwrite',
+            action='store_true',
+            help='Regenerate thumbnails that already exist, e.g. after changing THUMBNAIL_SIZES',
+        )
+
+    def handle(self, *args, **options):
+        written = 0
+        for model in (Course, *CONTENT_MODELS.values()):
+            images = model.objects.exclude(image='').exclude(image__isnull=True).only('image')
+            for instance in images.iterator():
+                try:
+                    written += generate_thumbnails(instance.image.storage, instance.image.name, options['overwrite'])
+                except (OSError, ValueError) as error:
+                    self.stderr.write(f'{model.__name__} {instance.pk}: {error}')
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} thumbnail(s)'))
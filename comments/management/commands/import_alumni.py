@@ -0,0 +1,63 @@
+import re
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from comments import alumni
+from comments.models import ALUMNI_EMAIL_MESSAGE, ALUMNI_EMAIL_REGEX, Alumni
+
+ALUMNI_IMPORT_BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Import alumni emails (one per line, or the first CSV column) in a single transaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to read, or '-' for standard input")
+        parser.add_argument('--batch-size', type=int, default=ALUMNI_IMPORT_BATCH_SIZE)
+        parser.add_argument(
+            '--skip-invalid',
+            action='store_true',
+            help='Import the valid emails and report the rest, instead of importing nothing',
+        )
+
+    def read_emails(self, path):
+        if path == '-':
+            return sys.stdin.read().splitlines()
+        with open(path, encoding='utf-8') as handle:
+            return handle.read().splitlines()
+
+    def handle(self, *args, **options):
+        lines = self.read_emails(options['path'])
+        emails = {line.split(',', 1)[0].strip().lower() for line in lines}
+        emails.discard('')
+        emails.discard('email')  # CSV header
+
+        # One compiled pattern for the whole file instead of a validator call per row
+        pattern = re.compile(ALUMNI_EMAIL_REGEX)
+        invalid = sorted(email for email in emails if not pattern.match(email))
+        if invalid:
+            for email in invalid[:20]:
+                self.stderr.write(f'{email}: {ALUMNI_EMAIL_MESSAGE}')
+            if len(invalid) > 20:
+                self.stderr.write(f'... and {len(invalid) - 20} more')
+            if not options['skip_invalid']:
+                raise CommandError(f'{len(invalid)} invalid email(s); nothing was imported')
+            emails.difference_update(invalid)
+
+        with transaction.atomic():
+            before = Alumni.objects.count()
+            # Emails that are already imported are skipped by the unique constraint
+            Alumni.objects.bulk_create(
+                (Alumni(email=email) for email in sorted(emails)),
+                batch_size=options['batch_size'],
+                ignore_conflicts=True,
+            )
+            created = Alumni.objects.count() - before
+        # bulk_create does not send post_save, so drop the cached alumni set here
+        alumni.invalidate()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {created} alumni ({len(emails) - created} already present, {len(invalid)} invalid)'
+        ))
@@ -0,0 +1,127 @@
+import csv
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from comments.models import CustomUser
+
+USER_IMPORT_BATCH_SIZE = 1000
+
+
+def _init_worker():
+    # Needed where workers are spawned rather than forked (macOS, Windows)
+    import django
+    django.setup()
+
+
+def _hash(password):
+    # No password (or an empty one) gives an unusable password, like create_user(password=None)
+    return make_password(password or None)
+
+
+class Command(BaseCommand):
+    help = (
+        'Create accounts in bulk from a CSV (email,password[,is_staff]) or JSONL stream. '
+        'Passwords are hashed across a process pool and rows are inserted with bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to read, or '-' for standard input")
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Input format; guessed from the file extension by default')
+        parser.add_argument('--batch-size', type=int, default=USER_IMPORT_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Hashing processes; 0 or 1 hashes in this process')
+
+    def read_rows(self, handle, input_format):
+        if input_format == 'csv':
+            yield from csv.DictReader(handle)
+            return
+        for number, line in enumerate(handle, start=1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as error:
+                    raise CommandError(f'line {number}: {error}')
+
+    def parse(self, rows):
+        """Yield ``(email, password, is_staff)`` for valid rows, reporting the rest."""
+        seen = set()
+        for number, row in enumerate(rows, start=1):
+            email = CustomUser.objects.normalize_email((row.get('email') or '').strip())
+            try:
+                validate_email(email)
+            except ValidationError:
+                self.stderr.write(f'row {number}: invalid email {email!r}')
+                self.invalid += 1
+                continue
+            if email in seen:
+                self.skipped += 1
+                continue
+            seen.add(email)
+            is_staff = str(row.get('is_staff', '')).strip().lower() in ('1', 'true', 'yes')
+            yield email, row.get('password') or '', is_staff
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        batch_size = options['batch_size']
+        self.created = self.skipped = self.invalid = 0
+
+        self.workers = options['workers']
+        pool = None
+        if self.workers > 1:
+            pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        handle = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8') if path == '-' else open(
+            path, encoding='utf-8', newline='')
+        try:
+            users = self.parse(self.read_rows(handle, input_format))
+            # Batches keep memory flat however long the input is
+            while batch := list(islice(users, batch_size)):
+                self.insert(batch, pool)
+        finally:
+            handle.close()
+            if pool is not None:
+                pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {self.created} user(s); {self.skipped} skipped as existing or duplicate, '
+            f'{self.invalid} invalid'
+        ))
+
+    def insert(self, batch, pool):
+        emails = [email for email, _, _ in batch]
+        existing = set(CustomUser.objects.filter(email__in=emails).values_list('email', flat=True))
+        batch = [row for row in batch if row[0] not in existing]
+        self.skipped += len(emails) - len(batch)
+        if not batch:
+            return
+
+        passwords = [password for _, password, _ in batch]
+        if pool is None:
+            hashes = [_hash(password) for password in passwords]
+        else:
+            hashes = list(pool.map(_hash, passwords, chunksize=max(1, len(passwords) // (self.workers * 4))))
+
+        with transaction.atomic():
+            before = CustomUser.objects.count()
+            # Rows another process added since the check above are skipped by the unique email
+            CustomUser.objects.bulk_create(
+                [
+                    CustomUser(email=email, password=hashed, is_staff=is_staff)
+                    for (email, _, is_staff), hashed in zip(batch, hashes)
+                ],
+                ignore_conflicts=True,
+            )
+            created = CustomUser.objects.count() - before
+        self.created += created
+        self.skipped += len(batch) - created
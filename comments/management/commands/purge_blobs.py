@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from comments.storage import ContentAddressedStorage
+
+
+class Command(BaseCommand):
+    help = 'Remove deduplicated content files that no row references, left behind by failed saves'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=24,
+            help='Only remove files at least this many hours old, so uploads still being saved are kept (default 24)',
+        )
+
+    def handle(self, *args, **options):
+        purged = ContentAddressedStorage().purge_unreferenced(timedelta(hours=options['older_than']))
+        self.stdout.write(self.style.SUCCESS(f'Removed {len(purged)} unreferenced blob(s)'))
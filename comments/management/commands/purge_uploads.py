@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from comments import uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete expired resumable upload sessions and their partial files'
+
+    def handle(self, *args, **options):
+        purged = uploads.purge_expired()
+        self.stdout.write(self.style.SUCCESS(f'Removed {purged} expired upload session(s)'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from comments import cache
+from comments.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Recompute Course.rating_sum and Course.rating_count from the Rating table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report how many courses have drifted, without updating them',
+        )
+
+    def handle(self, *args, **options):
+        drifted = Course.objects.with_drifted_rating_counters().count()
+        if options['check']:
+            self.stdout.write(f'{drifted} course(s) have drifted rating counters')
+            return
+
+        Course.objects.rebuild_rating_counters()
+        if drifted:
+            # The UPDATE bypasses the signals that bump versions and invalidate cached details
+            Course.objects.touch()
+            cache.clear()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating counters ({drifted} course(s) corrected)'))
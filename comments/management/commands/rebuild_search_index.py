@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from comments.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index from courses, course content and comments'
+
+    def handle(self, *args, **kwargs):
+        get_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS('Rebuilt the search index'))
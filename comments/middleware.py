@@ -0,0 +1,40 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import routers
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Scope database routing to the request (see comments/routers.py), and pin
+    a user who wrote to the primary for their next requests.
+    """
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routers.request_scope(request) as state:
+            response = self.get_response(request)
+        user_id = self.user_to_pin(state)
+        if user_id is not None:
+            routers.pin_user(user_id)
+        return response
+
+    async def __acall__(self, request):
+        with routers.request_scope(request) as state:
+            response = await self.get_response(request)
+        user_id = self.user_to_pin(state)
+        if user_id is not None:
+            await routers.apin_user(user_id)
+        return response
+
+    def user_to_pin(self, state):
+        if state.wrote and state.replica is not None:
+            return state.user_id()
+        return None
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0015_alter_coursematerial_description_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['course', '-timestamp', '-id'], name='comment_course_ts_id_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:45
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_rating_counters(apps, schema_editor):
+    Course = apps.get_model('comments', 'Course')
+    Rating = apps.get_model('comments', 'Rating')
+    db_alias = schema_editor.connection.alias
+    per_course = Rating.objects.using(db_alias).filter(course=OuterRef('pk')).order_by().values('course')
+    Course.objects.using(db_alias).update(
+        rating_sum=Coalesce(Subquery(per_course.annotate(total=Sum('rating')).values('total')), 0,
+                            output_field=IntegerField()),
+        rating_count=Coalesce(Subquery(per_course.annotate(total=Count('id')).values('total')), 0,
+                              output_field=IntegerField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0016_comment_course_ts_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_rating_counters, migrations.RunPython.noop),
+    ]
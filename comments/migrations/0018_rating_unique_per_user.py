@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:46
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Min, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_ratings(apps, schema_editor):
+    # Keep each user's first rating of a course so the unique constraint can be added
+    Course = apps.get_model('comments', 'Course')
+    Rating = apps.get_model('comments', 'Rating')
+    db_alias = schema_editor.connection.alias
+    keep = (
+        Rating.objects.using(db_alias).values('course', 'user')
+        .annotate(first_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for group in list(keep):
+        Rating.objects.using(db_alias).filter(course=group['course'], user=group['user']).exclude(id=group['first_id']).delete()
+
+    per_course = Rating.objects.using(db_alias).filter(course=OuterRef('pk')).order_by().values('course')
+    Course.objects.using(db_alias).update(
+        rating_sum=Coalesce(Subquery(per_course.annotate(total=Sum('rating')).values('total')), 0,
+                            output_field=IntegerField()),
+        rating_count=Coalesce(Subquery(per_course.annotate(total=Count('id')).values('total')), 0,
+                              output_field=IntegerField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0017_course_rating_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_ratings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='rating',
+            constraint=models.UniqueConstraint(fields=('course', 'user'), name='unique_rating_per_user'),
+        ),
+    ]
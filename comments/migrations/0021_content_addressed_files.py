@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:55
+
+import comments.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0020_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('references', models.PositiveIntegerField(default=1)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='assignment',
+            name='file',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=comments.storage.content_file_storage, upload_to='assignments/files/'),
+        ),
+        migrations.AlterField(
+            model_name='coursematerial',
+            name='file',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=comments.storage.content_file_storage, upload_to='courseMaterial/files/'),
+        ),
+        migrations.AlterField(
+            model_name='pastpaper',
+            name='file',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=comments.storage.content_file_storage, upload_to='pastPaper/files/'),
+        ),
+        migrations.AlterField(
+            model_name='quizz',
+            name='file',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=comments.storage.content_file_storage, upload_to='quizz/files/'),
+        ),
+    ]
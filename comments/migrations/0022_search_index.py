@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:58
+
+from django.db import migrations
+
+# rowid = pk * 8 + kind code, see comments/search.py
+SEARCH_SOURCES = [
+    ('comments_course', 1, "id, title, description"),
+    ('comments_comment', 2, "course_id, '', text"),
+    ('comments_assignment', 3, "course_id, title, description"),
+    ('comments_quizz', 4, "course_id, title, description"),
+    ('comments_pastpaper', 5, "course_id, title, description"),
+    ('comments_coursematerial', 6, "course_id, title, description"),
+]
+
+
+def create_search_index(apps, schema_editor):
+    # Only SQLite has FTS5; other databases use DatabaseSearchBackend
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS comments_search USING fts5("
+        "course_id UNINDEXED, title, body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    for table, code, columns in SEARCH_SOURCES:
+        schema_editor.execute(
+            f"INSERT INTO comments_search (rowid, course_id, title, body) SELECT id * 8 + {code}, {columns} FROM {table}"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS comments_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0021_content_addressed_files'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:09
+
+import comments.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0023_access_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, default=comments.models.upload_session_expiry),
+        ),
+    ]
@@ -1,8 +1,17 @@
 
 
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.core.validators import RegexValidator
 from django.db import models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import alumni
+from .storage import content_file_storage
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None):
@@ -32,7 +41,7 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):  # Inherit from Permission
     objects = CustomUserManager()
 
     def is_alumni(self):
-        return Alumni.objects.filter(email=self.email).exists()
+        return alumni.is_alumni(self.email)
 
     def __str__(self):
         return self.email
@@ -41,70 +50,207 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):  # Inherit from Permission
 
 class Comment(models.Model):
     user = models.ForeignKey('comments.CustomUser', on_delete=models.CASCADE)
-    course = models.ForeignKey('Course', related_name='comments', on_delete=models.CASCADE)  # Add this line
+    # Unindexed on its own: comment_course_ts_id_idx leads with course
+    course = models.ForeignKey('Course', related_name='comments', on_delete=models.CASCADE, db_index=False)
     text = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Matches the keyset pagination order used by CommentView.get; also
+            # serves every other lookup by course, so the table is written to one
+            # course index only
+            models.Index(fields=['course', '-timestamp', '-id'], name='comment_course_ts_id_idx'),
+        ]
+
     def __str__(self):
         return self.text
 
 
+class CourseQuerySet(models.QuerySet):
+    def _rating_totals(self):
+        per_course = Rating.objects.filter(course=models.OuterRef('pk')).order_by().values('course')
+        return {
+            'actual_rating_sum': Coalesce(
+                models.Subquery(per_course.annotate(total=models.Sum('rating')).values('total')), 0,
+                output_field=models.IntegerField(),
+            ),
+            'actual_rating_count': Coalesce(
+                models.Subquery(per_course.annotate(total=models.Count('id')).values('total')), 0,
+                output_field=models.IntegerField(),
+            ),
+        }
+
+    def with_drifted_rating_counters(self):
+        return self.annotate(**self._rating_totals()).exclude(
+            rating_sum=models.F('actual_rating_sum'),
+            rating_count=models.F('actual_rating_count'),
+        )
+
+    def touch(self):
+        # Bump updated_at without a model save, e.g. when child content changes
+        return self.update(updated_at=timezone.now())
+
+    def rebuild_rating_counters(self):
+        # A single UPDATE ... SET col = (subquery) so no rows are loaded into Python
+        totals = self._rating_totals()
+        return self.update(rating_sum=totals['actual_rating_sum'], rating_count=totals['actual_rating_count'])
+
+
 class Course(models.Model):
     title = models.CharField(max_length=200, default="Untitled Course")
     description = models.TextField(default="No description available")
     created_at = models.DateTimeField(auto_now_add=True)
+    # Version stamp for conditional GETs; also bumped when comments, ratings or content change
+    updated_at = models.DateTimeField(auto_now=True)
     image = models.ImageField(upload_to='courses/images/', blank=True, null=True)
+    # Running totals of Rating rows, kept in step by CourseDetailView.post and
+    # signals.release_rating, and rebuilt by the rebuild_rating_counters command
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+
+    objects = CourseQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Catalog ?ordering=created_at, with or without created_after/created_before
+            models.Index(fields=['created_at'], name='course_created_at_idx'),
+        ]
+
+    @property
+    def average_rating(self):
+        if self.rating_count:
+            return self.rating_sum / self.rating_count
+        return 0
 
     def __str__(self):
         return self.title
 
 class Rating(models.Model):
-    course = models.ForeignKey(Course, related_name='ratings', on_delete=models.CASCADE)
+    # Unindexed on its own: rating_course_id_idx leads with course
+    course = models.ForeignKey(Course, related_name='ratings', on_delete=models.CASCADE, db_index=False)
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     rating = models.IntegerField(default=0)  # Rating from 1 to 5
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'user'], name='unique_rating_per_user'),
+        ]
+        indexes = [
+            # Course detail's ratings page, in id order
+            models.Index(fields=['course', 'id'], name='rating_course_id_idx'),
+        ]
+
     def __str__(self):
         return f"Rating for {self.course.title} by {self.user.email}"
 
-class Assignment(models.Model):
-    course = models.ForeignKey(Course, related_name='assignments', on_delete=models.CASCADE)
+class CourseContent(models.Model):
+    """
+    Shared fields for the downloadable content attached to a course.
+
+    Each subclass keeps its own table, ``course`` related name and upload
+    directories; ``kind`` names the content type in URLs, cache keys and
+    cross-type listings, and ``label`` is used in API messages.
+    """
+    kind = None
+    label = None
+
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)  # Avoid null=True for TextField
-    image = models.ImageField(upload_to='assignments/images/', blank=True, null=True)  # Optional image field
-    file = models.FileField(upload_to='assignments/files/', blank=True, null=True)  # Optional file field
+
+    class Meta:
+        abstract = True
 
     def __str__(self):
         return self.title
 
-class Quizz(models.Model):
+class Assignment(CourseContent):
+    kind = 'assignments'
+    label = 'Assignment'
+
+    course = models.ForeignKey(Course, related_name='assignments', on_delete=models.CASCADE)
+    image = models.ImageField(upload_to='assignments/images/', blank=True, null=True)  # Optional image field
+    file = models.FileField(upload_to='assignments/files/', storage=content_file_storage, max_length=255, blank=True, null=True)  # Optional file field
+
+class Quizz(CourseContent):
+    kind = 'quizzes'
+    label = 'Quizz'
+
     course = models.ForeignKey(Course, related_name='quizz', on_delete=models.CASCADE)
-    title = models.CharField(max_length=200)
-    description = models.TextField(blank=True)
     image = models.ImageField(upload_to='quizz/images/', blank=True, null=True)  # Optional image field
-    file = models.FileField(upload_to='quizz/files/', blank=True, null=True)  # File field for documents
+    file = models.FileField(upload_to='quizz/files/', storage=content_file_storage, max_length=255, blank=True, null=True)  # File field for documents
 
-    def __str__(self):
-        return self.title
+class PastPaper(CourseContent):
+    kind = 'pastpapers'
+    label = 'Past paper'
 
-class PastPaper(models.Model):
     course = models.ForeignKey(Course, related_name='pastPaper', on_delete=models.CASCADE)
-    title = models.CharField(max_length=200)
-    description = models.TextField(blank=True)
     image = models.ImageField(upload_to='pastPaper/images/', blank=True, null=True)  # Optional image field
-    file = models.FileField(upload_to='pastPaper/files/', blank=True, null=True)  # File field for documents
+    file = models.FileField(upload_to='pastPaper/files/', storage=content_file_storage, max_length=255, blank=True, null=True)  # File field for documents
 
-    def __str__(self):
-        return self.title
+class CourseMaterial(CourseContent):
+    kind = 'coursematerials'
+    label = 'Course material'
 
-class CourseMaterial(models.Model):
     course = models.ForeignKey(Course, related_name='courseMaterial', on_delete=models.CASCADE)
+    image = models.ImageField(upload_to='courseMaterial/images/', blank=True, null=True)  # Optional image field
+    file = models.FileField(upload_to='courseMaterial/files/', storage=content_file_storage, max_length=255, blank=True, null=True)  # File field for documents
+
+
+# Every CourseContent model by kind
+CONTENT_MODELS = {model.kind: model for model in (Assignment, Quizz, PastPaper, CourseMaterial)}
+
+
+class StoredBlob(models.Model):
+    """Reference count for a file kept once by ContentAddressedStorage."""
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    name = models.CharField(max_length=255)
+    references = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.name} ({self.references} references)"
+
+
+def upload_session_expiry():
+    return timezone.now() + timedelta(seconds=settings.CHUNKED_UPLOAD_EXPIRY)
+
+
+class UploadSessionQuerySet(models.QuerySet):
+    def open(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+
+class UploadSession(models.Model):
+    """
+    A resumable upload of a CourseContent file, assembled chunk by chunk on disk
+    (see comments/uploads.py) and turned into a content row once complete.
+    Sessions with no chunk for CHUNKED_UPLOAD_EXPIRY seconds expire, and
+    uploads.purge_expired removes them with their partial files.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20, choices=[(kind, model.label) for kind, model in CONTENT_MODELS.items()])
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
-    image = models.ImageField(upload_to='courseMaterial/images/', blank=True, null=True)  # Optional image field
-    file = models.FileField(upload_to='courseMaterial/files/', blank=True, null=True)  # File field for documents
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    received = models.PositiveBigIntegerField(default=0)  # Bytes written so far, i.e. the next offset
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(default=upload_session_expiry, db_index=True)  # Pushed back by each chunk
+
+    objects = UploadSessionQuerySet.as_manager()
 
     def __str__(self):
-        return self.title
+        return f"{self.filename} ({self.received}/{self.size})"
+
+
+ALUMNI_EMAIL_REGEX = r"^l\d{6}@lhr\.nu\.edu\.pk$"
+ALUMNI_EMAIL_MESSAGE = "Email must be in the format lnnnnnn@lhr.nu.edu.pk"
 
 
 class Alumni(models.Model):
@@ -113,8 +259,8 @@ class Alumni(models.Model):
         max_length=255,
         validators=[
             RegexValidator(
-                regex=r"^l\d{6}@lhr\.nu\.edu\.pk$",
-                message="Email must be in the format lnnnnnn@lhr.nu.edu.pk",
+                regex=ALUMNI_EMAIL_REGEX,
+                message=ALUMNI_EMAIL_MESSAGE,
             )
         ],
     )
@@ -0,0 +1,198 @@
+import base64
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination, LimitOffsetPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import replace_query_param
+
+from . import renderers
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+STREAM_CHUNK_SIZE = 500
+INVALID_CURSOR_MESSAGE = "Invalid cursor"
+
+
+class KeysetPagination:
+    """
+    Keyset (cursor) pagination over ``(timestamp, id)`` in descending order.
+
+    Unlike offset pagination the cost of fetching a page does not grow with
+    its position, and rows inserted while a client is paging never shift the
+    results. The cursor is an opaque token holding the last row's key.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = ('-timestamp', '-id')
+
+    def __init__(self, page_size=DEFAULT_PAGE_SIZE):
+        self.page_size = page_size
+
+    @classmethod
+    def is_requested(cls, request):
+        params = request.query_params
+        return cls.cursor_query_param in params or cls.page_size_query_param in params
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, MAX_PAGE_SIZE))
+
+    def encode_cursor(self, obj):
+        # Rows may be model instances or values() dicts
+        timestamp, pk = (obj['timestamp'], obj['id']) if isinstance(obj, dict) else (obj.timestamp, obj.id)
+        raw = f"{timestamp.isoformat()}|{pk}"
+        return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii')
+            timestamp, pk = raw.rsplit('|', 1)
+            timestamp = parse_datetime(timestamp)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(INVALID_CURSOR_MESSAGE)
+        if timestamp is None:
+            raise NotFound(INVALID_CURSOR_MESSAGE)
+        return timestamp, pk
+
+    def page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            timestamp, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk))
+
+        # Fetch one extra row to learn whether a next page exists without a COUNT.
+        return queryset[:self.page_size + 1]
+
+    def finish_page(self, page):
+        self.next_cursor = self.encode_cursor(page[self.page_size - 1]) if len(page) > self.page_size else None
+        return page[:self.page_size]
+
+    def paginate_queryset(self, queryset, request):
+        return self.finish_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        return self.finish_page([row async for row in self.page_queryset(queryset, request)])
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'results': data,
+        }
+
+
+class CourseLimitOffsetPagination(LimitOffsetPagination):
+    default_limit = DEFAULT_PAGE_SIZE
+    max_limit = MAX_PAGE_SIZE
+
+
+class CourseCursorPagination(CursorPagination):
+    # The view's OrderingFilter takes precedence over this default
+    ordering = 'id'
+    page_size = DEFAULT_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
+
+class OptionalPagination(BasePagination):
+    """
+    Pick a pagination style from the query string, so clients opt in.
+
+    ``?limit=``/``?offset=`` use limit/offset, ``?cursor=``/``?page_size=`` use
+    cursor pagination, and neither keeps the plain, unpaginated list.
+    """
+    limit_offset_class = CourseLimitOffsetPagination
+    cursor_class = CourseCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if 'cursor' in params or 'page_size' in params:
+            self.paginator = self.cursor_class()
+        elif 'limit' in params or 'offset' in params:
+            self.paginator = self.limit_offset_class()
+        else:
+            return None
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+
+def parse_limit_offset(request, limit_param='limit', offset_param='offset'):
+    """
+    Read a ``(limit, offset)`` pair from the query string.
+
+    ``limit`` is None when the client did not ask for paging; invalid values
+    fall back to the defaults like DRF's LimitOffsetPagination does.
+    """
+    try:
+        limit = max(1, min(int(request.query_params[limit_param]), MAX_PAGE_SIZE))
+    except (KeyError, TypeError, ValueError):
+        limit = None
+    try:
+        offset = max(0, int(request.query_params[offset_param]))
+    except (KeyError, TypeError, ValueError):
+        offset = 0
+    return limit, offset
+
+
+def stream_json_list(queryset, serializer_class, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Stream ``queryset`` as a JSON array, serializing one row at a time.
+
+    Rows are read with ``.iterator()`` so neither the model instances nor the
+    rendered payload are ever held in memory all at once. ``serializer_class``
+    may also be a ValuesSerializer.
+    """
+    # Same renderer as buffered responses, so both produce the same bytes
+    renderer = renderers.ORJSONRenderer() if settings.FAST_JSON else JSONRenderer()
+
+    if hasattr(serializer_class, 'iter_data'):
+        items = serializer_class(queryset).iter_data(chunk_size)
+    else:
+        items = (serializer_class(obj).data for obj in queryset.iterator(chunk_size=chunk_size))
+
+    def generate():
+        yield '['
+        for index, item in enumerate(items):
+            if index:
+                yield ','
+            yield renderer.render(item)
+        yield ']'
+
+    return StreamingHttpResponse(generate(), content_type='application/json')
+
+
+def astream_json_list(queryset, serializer_class, chunk_size=STREAM_CHUNK_SIZE):
+    """``stream_json_list`` for async views; ``serializer_class`` must be a ValuesSerializer."""
+    renderer = renderers.ORJSONRenderer() if settings.FAST_JSON else JSONRenderer()
+    serializer = serializer_class(queryset)
+
+    async def generate():
+        yield '['
+        index = 0
+        async for row in serializer.rows().aiterator(chunk_size=chunk_size):
+            if index:
+                yield ','
+            yield renderer.render(serializer.to_representation(row))
+            index += 1
+        yield ']'
+
+    return StreamingHttpResponse(generate(), content_type='application/json')
@@ -0,0 +1,45 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional; JSONRenderer is used without it
+    orjson = None
+
+_fallback = JSONEncoder().default
+
+
+def dumps(data):
+    """
+    Encode ``data`` exactly as DRF's compact JSONRenderer would.
+
+    Dates, times and anything orjson does not know natively go through DRF's
+    encoder, and the two line separators are escaped like DRF does, so the
+    bytes match. Raises TypeError for data orjson cannot encode.
+    """
+    if orjson is None:
+        raise TypeError("orjson is not installed")
+    return (
+        orjson.dumps(data, default=_fallback, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        .replace('\u2028'.encode('utf-8'), b'\\u2028')
+        .replace('\u2029'.encode('utf-8'), b'\\u2029')
+    )
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson, used when FAST_JSON is on.
+
+    Indented (browsable or ``; indent=``) responses and data orjson rejects,
+    such as integers wider than 64 bits, fall back to the standard renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is None:
+            try:
+                return dumps(data)
+            except TypeError:
+                pass
+        return super().render(data, accepted_media_type, renderer_context)
@@ -0,0 +1,152 @@
+"""
+Primary/replica routing for the comments app.
+
+While a request is being served, reads of ``comments`` models go to one of
+settings.DATABASE_REPLICAS and writes go to the primary (``default``). Reads
+stay on the primary when replication lag could hide the client's own write:
+
+* later in a request that has written, or inside a transaction on the primary;
+* for REPLICA_STICKY_SECONDS after a user's write, on any of their requests.
+
+The pins of the second rule live in the REPLICA_PIN_CACHE cache, so every
+worker process serving the user sees them.
+
+Code running outside a request (management commands, background work) always
+uses the primary. Rows that live on another alias, such as the scratch files
+of benchmark_db_writes, are read and written where they live, and models of
+other apps are left to Django's defaults.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import LazyObject
+
+APP_LABEL = 'comments'
+PIN_KEY = 'replica-pin:{user_id}'
+
+
+class RequestState:
+    """Routing state of one request, shared by the threads serving it."""
+
+    def __init__(self, request=None):
+        self.request = request
+        self.replica = random.choice(settings.DATABASE_REPLICAS) if settings.DATABASE_REPLICAS else None
+        self.wrote = False
+        self.pinned = False
+        self.checked_user_id = None
+
+    def user_id(self):
+        # Only once authentication has set a real user; evaluating the lazy
+        # session user here would query the database from inside the router
+        user = self.request.__dict__.get('user') if self.request is not None else None
+        if user is None or isinstance(user, LazyObject) or not user.is_authenticated:
+            return None
+        return str(user.pk)  # token users carry the id as a string
+
+    def is_pinned(self):
+        if not self.pinned:
+            user_id = self.user_id()
+            if user_id is not None and user_id != self.checked_user_id:
+                self.checked_user_id = user_id
+                self.pinned = bool(pin_cache().get(PIN_KEY.format(user_id=user_id)))
+        return self.pinned
+
+    async def ais_pinned(self):
+        if not self.pinned:
+            user_id = self.user_id()
+            if user_id is not None and user_id != self.checked_user_id:
+                self.checked_user_id = user_id
+                self.pinned = bool(await pin_cache().aget(PIN_KEY.format(user_id=user_id)))
+        return self.pinned
+
+    def reads_primary(self):
+        return self.wrote or connections[DEFAULT_DB_ALIAS].in_atomic_block or self.is_pinned()
+
+
+_state = contextvars.ContextVar('replica_routing_state', default=None)
+
+
+@contextmanager
+def request_scope(request=None):
+    """Route the enclosed queries as part of ``request``; yields its RequestState."""
+    state = RequestState(request)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def pin_cache():
+    return caches[settings.REPLICA_PIN_CACHE]
+
+
+def pin_user(user_id):
+    """Keep ``user_id`` on the primary until the replicas have caught up with their write."""
+    pin_cache().set(PIN_KEY.format(user_id=str(user_id)), True, settings.REPLICA_STICKY_SECONDS)
+
+
+async def apin_user(user_id):
+    await pin_cache().aset(PIN_KEY.format(user_id=str(user_id)), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_pinned():
+    """Whether the current request belongs to a user pinned to the primary."""
+    state = _state.get()
+    return state is not None and state.replica is not None and state.is_pinned()
+
+
+async def ais_pinned():
+    state = _state.get()
+    return state is not None and state.replica is not None and await state.ais_pinned()
+
+
+def reads_replica():
+    """Whether the current request reads the comments app from a replica."""
+    state = _state.get()
+    return state is not None and state.replica is not None and not state.reads_primary()
+
+
+def _instance_db(hints):
+    """The database of the ``instance`` hint, for models on another alias such as a scratch database."""
+    instance = hints.get('instance')
+    return instance._state.db if instance is not None else None
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if model._meta.app_label != APP_LABEL or state is None or state.replica is None:
+            return None
+        db = _instance_db(hints)
+        if db is not None and db not in (DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS):
+            return db
+        return DEFAULT_DB_ALIAS if state.reads_primary() else state.replica
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label != APP_LABEL:
+            return None
+        db = _instance_db(hints)
+        if db is not None and db not in (DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS):
+            return db
+        # Rows read from a replica are written back through the primary
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return obj1._state.db == obj2._state.db
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
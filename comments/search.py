@@ -0,0 +1,174 @@
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Comment, Course, CONTENT_MODELS
+
+SEARCH_TABLE = 'comments_search'
+
+# Searchable models by kind. The numeric codes are packed into the FTS rowid
+# (pk * ROWID_STRIDE + code) so a single document can be replaced by rowid.
+SEARCH_KINDS = {
+    'courses': (1, Course),
+    'comments': (2, Comment),
+    **{kind: (code, model) for code, (kind, model) in enumerate(CONTENT_MODELS.items(), start=3)},
+}
+KINDS_BY_CODE = {code: kind for kind, (code, model) in SEARCH_KINDS.items()}
+ROWID_STRIDE = 8
+TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def kind_of(model):
+    for kind, (code, search_model) in SEARCH_KINDS.items():
+        if search_model is model:
+            return kind
+    return None
+
+
+def document(kind, instance):
+    """Return ``(course_id, title, body)`` for an indexed instance."""
+    if kind == 'courses':
+        return instance.pk, instance.title, instance.description
+    if kind == 'comments':
+        return instance.course_id, '', instance.text
+    return instance.course_id, instance.title, instance.description
+
+
+class BaseSearchBackend:
+    def index(self, kind, instance):
+        raise NotImplementedError
+
+    def remove(self, kind, pk):
+        raise NotImplementedError
+
+    def search(self, query, kinds=None, limit=20):
+        """Return ranked hits as dicts with kind, id, course, title and snippet."""
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """
+    Inverted index in an SQLite FTS5 virtual table (created by migration 0022).
+
+    Every term is matched as a prefix and results are ranked with BM25, with
+    titles weighted above bodies.
+    """
+    title_weight = 10.0
+    body_weight = 1.0
+
+    def _rowid(self, kind, pk):
+        return pk * ROWID_STRIDE + SEARCH_KINDS[kind][0]
+
+    def index(self, kind, instance):
+        course_id, title, body = document(kind, instance)
+        rowid = self._rowid(kind, instance.pk)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [rowid])
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, course_id, title, body) VALUES (%s, %s, %s, %s)',
+                [rowid, course_id, title, body],
+            )
+
+    def remove(self, kind, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [self._rowid(kind, pk)])
+
+    def match_expression(self, query):
+        # Quote every term so user input can't inject FTS5 syntax, and match prefixes
+        return ' '.join(f'"{term}"*' for term in TERM.findall(query))
+
+    def search(self, query, kinds=None, limit=20):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        sql = (
+            f'SELECT rowid, course_id, title, snippet({SEARCH_TABLE}, -1, \'[\', \']\', \'…\', 12) '
+            f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+        )
+        params = [expression]
+        if kinds:
+            codes = [SEARCH_KINDS[kind][0] for kind in kinds]
+            sql += f' AND rowid %% {ROWID_STRIDE} IN ({", ".join(["%s"] * len(codes))})'
+            params += codes
+        sql += f' ORDER BY bm25({SEARCH_TABLE}, 0, {self.title_weight}, {self.body_weight}) LIMIT %s'
+        params.append(limit)
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        return [
+            {
+                'kind': KINDS_BY_CODE[rowid % ROWID_STRIDE],
+                'id': rowid // ROWID_STRIDE,
+                'course': course_id,
+                'title': title,
+                'snippet': snippet,
+            }
+            for rowid, course_id, title, snippet in rows
+        ]
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            for kind, (code, model) in SEARCH_KINDS.items():
+                table = model._meta.db_table
+                if kind == 'courses':
+                    columns = 'id, title, description'
+                elif kind == 'comments':
+                    columns = "course_id, '', text"
+                else:
+                    columns = 'course_id, title, description'
+                # Set-based copy, so rebuilding never loads rows into Python
+                cursor.execute(
+                    f'INSERT INTO {SEARCH_TABLE} (rowid, course_id, title, body) '
+                    f'SELECT id * {ROWID_STRIDE} + {code}, {columns} FROM {table}'
+                )
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """
+    Index-free fallback for databases without FTS5, using ``icontains``.
+
+    Title matches rank above body matches; fine for small catalogues only.
+    """
+
+    def index(self, kind, instance):
+        pass
+
+    def remove(self, kind, pk):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, query, kinds=None, limit=20):
+        terms = TERM.findall(query)
+        if not terms:
+            return []
+        hits = []
+        for kind in kinds or SEARCH_KINDS:
+            model = SEARCH_KINDS[kind][1]
+            fields = ('text',) if kind == 'comments' else ('title', 'description')
+            condition = Q()
+            for term in terms:
+                condition &= Q(*[Q(**{f'{field}__icontains': term}) for field in fields], _connector=Q.OR)
+            for instance in model.objects.filter(condition)[:limit]:
+                course_id, title, body = document(kind, instance)
+                in_title = all(term.lower() in title.lower() for term in terms)
+                hits.append((not in_title, {
+                    'kind': kind, 'id': instance.pk, 'course': course_id, 'title': title, 'snippet': body[:120],
+                }))
+        hits.sort(key=lambda hit: hit[0])
+        return [hit for _, hit in hits[:limit]]
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(settings.SEARCH_BACKEND)()
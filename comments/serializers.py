@@ -1,3 +1,10 @@
+import abc
+import os
+import re
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
 from rest_framework import serializers
 from .models import CustomUser  # Import the custom user model
 from .models import Comment
@@ -7,6 +14,10 @@ from .models import Assignment
 from .models import Quizz
 from .models import PastPaper
 from .models import CourseMaterial
+from .models import UploadSession
+from .models import CONTENT_MODELS
+from .downloads import download_url
+from .thumbnails import thumbnail_urls
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -34,10 +45,56 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ['id', 'text', 'timestamp', 'user_email', 'course_title']
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class ThumbnailsField(serializers.Field):
+    """URLs of the generated thumbnails of an ImageField, by size."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'image')
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        # Keep empty images: to_representation still reports every size as None
+        return getattr(instance, self.source)
+
+    def to_representation(self, value):
+        return thumbnail_urls(value.storage, value.name, self.context.get('request'))
+
+
+class DownloadURLField(serializers.FileField):
+    """A content file, linked through its row's download route rather than MEDIA_URL."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return download_url(self.context.get('request'), type(value.instance), value.instance.pk)
+
+
+class SparseFieldsMixin:
+    """
+    Let clients pick response fields with ``?fields=id,title``.
+
+    Unknown names are ignored; without the parameter every field is returned.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        requested = request.query_params.get('fields') if request is not None else None
+        if requested:
+            keep = set(requested.split(','))
+            for name in set(self.fields) - keep:
+                self.fields.pop(name)
+
+
+class CourseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    average_rating = serializers.ReadOnlyField()
+    number_of_ratings = serializers.IntegerField(source='rating_count', read_only=True)
+    thumbnails = ThumbnailsField()
+
     class Meta:
         model = Course
-        fields = ['id', 'title', 'description', 'created_at', 'image']
+        fields = ['id', 'title', 'description', 'created_at', 'image', 'thumbnails', 'average_rating', 'number_of_ratings']
 
 
 class RatingSerializer(serializers.ModelSerializer):
@@ -45,45 +102,244 @@ class RatingSerializer(serializers.ModelSerializer):
         model = Rating
         fields = ['id', 'course', 'user', 'rating']
 
+class RatingImportSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    rating = serializers.IntegerField(min_value=1, max_value=5)
+
+
 class CourseDetailSerializer(serializers.ModelSerializer):
-    ratings = RatingSerializer(many=True, read_only=True)
-    average_rating = serializers.SerializerMethodField()
-    number_of_ratings = serializers.SerializerMethodField()
+    ratings = serializers.SerializerMethodField()
+    average_rating = serializers.ReadOnlyField()
+    number_of_ratings = serializers.IntegerField(source='rating_count', read_only=True)
+    thumbnails = ThumbnailsField()
 
     class Meta:
         model = Course
-        fields = ['id', 'title', 'description', 'created_at', 'image', 'ratings', 'average_rating', 'number_of_ratings']
+        fields = ['id', 'title', 'description', 'created_at', 'image', 'thumbnails', 'ratings', 'average_rating',
+                  'number_of_ratings']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Context flags: include_ratings=False drops the raw list, ratings_limit/ratings_offset page it
+        if not self.context.get('include_ratings', True):
+            self.fields.pop('ratings')
 
-    def get_average_rating(self, obj):
-        ratings = obj.ratings.all()
-        if ratings:
-            return sum(rating.rating for rating in ratings) / len(ratings)
-        return 0
+    @staticmethod
+    def ratings_page(ratings, context):
+        ratings = ratings.order_by('id')
+        limit = context.get('ratings_limit')
+        if limit is not None:
+            offset = context.get('ratings_offset', 0)
+            ratings = ratings[offset:offset + limit]
+        return ratings
 
-    def get_number_of_ratings(self, obj):
-        return obj.ratings.count()
+    def get_ratings(self, obj):
+        # The async view fetches the page itself and passes it in as context['ratings']
+        ratings = self.context.get('ratings')
+        if ratings is None:
+            ratings = self.ratings_page(obj.ratings.all(), self.context)
+        return RatingSerializer(ratings, many=True).data
 
 
-class AssignmentSerializer(serializers.ModelSerializer):
+class CourseContentSerializer(serializers.ModelSerializer):
+    thumbnails = ThumbnailsField()
+    file = DownloadURLField(max_length=255, required=False, allow_null=True)
+
     class Meta:
+        fields = ['id', 'title', 'description', 'image', 'thumbnails', 'file', 'course']
+
+
+class AssignmentSerializer(CourseContentSerializer):
+    class Meta(CourseContentSerializer.Meta):
         model = Assignment
-        fields = ['id', 'title', 'description', 'image', 'file', 'course']
 
 
-class QuizzSerializer(serializers.ModelSerializer):
-    class Meta:
+class QuizzSerializer(CourseContentSerializer):
+    class Meta(CourseContentSerializer.Meta):
         model = Quizz
-        fields = ['id', 'title', 'description', 'image', 'file', 'course']
 
-class PastPaperSerializer(serializers.ModelSerializer):
-    class Meta:
+class PastPaperSerializer(CourseContentSerializer):
+    class Meta(CourseContentSerializer.Meta):
         model = PastPaper
-        fields = ['id', 'title', 'description', 'image', 'file', 'course']
 
-class CourseMaterialSerializer(serializers.ModelSerializer):
-    class Meta:
+class CourseMaterialSerializer(CourseContentSerializer):
+    class Meta(CourseContentSerializer.Meta):
         model = CourseMaterial
-        fields = ['id', 'title', 'description', 'image', 'file', 'course']
 
 
+# Serializer for each CourseContent kind
+CONTENT_SERIALIZERS = {
+    serializer.Meta.model.kind: serializer
+    for serializer in (AssignmentSerializer, QuizzSerializer, PastPaperSerializer, CourseMaterialSerializer)
+}
+
+
+class ContentSummarySerializer(serializers.Serializer):
+    """Rows of the cross-type content listing, built from ``.values()`` dicts."""
+    kind = serializers.CharField()
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    description = serializers.CharField()
+    image = serializers.SerializerMethodField()
+    thumbnails = serializers.SerializerMethodField()
+    file = serializers.SerializerMethodField()
+    course = serializers.IntegerField()
+
+    def _url(self, name):
+        if not name:
+            return None
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def get_image(self, row):
+        return self._url(row['image'])
+
+    def get_thumbnails(self, row):
+        return thumbnail_urls(default_storage, row['image'], self.context.get('request'))
+
+    def get_file(self, row):
+        if not row['file']:
+            return None
+        return download_url(self.context.get('request'), CONTENT_MODELS[row['kind']], row['id'])
 
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(source='received', read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'kind', 'course', 'title', 'description', 'filename', 'size', 'sha256', 'offset']
+
+    def validate_filename(self, value):
+        filename = os.path.basename(value)
+        if not filename:
+            raise serializers.ValidationError("A file name is required.")
+        return filename
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.CHUNKED_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Size must be between 1 and {settings.CHUNKED_UPLOAD_MAX_SIZE} bytes.")
+        return value
+
+    def validate_sha256(self, value):
+        value = value.lower()
+        if not re.fullmatch(r'[0-9a-f]{64}', value):
+            raise serializers.ValidationError("Must be a hex-encoded SHA-256 digest.")
+        return value
+
+
+class ValuesSerializer(abc.ABC):
+    """
+    Read-only fast path that builds response dicts straight from ``.values()``
+    rows, skipping model instances and per-field serializer machinery.
+
+    Each subclass mirrors a ModelSerializer and must produce identical output;
+    ``manage.py benchmark_json`` checks this. Used when FAST_JSON is on.
+    """
+    columns = ()
+    fields = ()
+    sparse_fields = False  # honour ?fields= like SparseFieldsMixin
+
+    def __init__(self, queryset, many=True, context=None):
+        assert many, "ValuesSerializer only serializes lists"
+        self.queryset = queryset
+        self.context = context or {}
+        # Look the active time zone up once, not once per row like DateTimeField does
+        self._datetime = serializers.DateTimeField(
+            default_timezone=timezone.get_current_timezone() if settings.USE_TZ else None
+        )
+        request = self.context.get('request')
+        requested = request.query_params.get('fields') if request is not None else None
+        if requested and self.sparse_fields:
+            keep = set(requested.split(','))
+            self.fields = tuple(name for name in self.fields if name in keep)
+
+    def rows(self):
+        # Pages from a paginator arrive as lists, or querysets already reduced with values()
+        if isinstance(self.queryset, list) or self.queryset._fields is not None:
+            return self.queryset
+        return self.queryset.values(*self.columns)
+
+    @abc.abstractmethod
+    def to_representation(self, row):
+        """Return the response dict for one ``.values()`` row of ``columns``."""
+
+    def iter_data(self, chunk_size):
+        for row in self.rows().iterator(chunk_size=chunk_size):
+            yield self.to_representation(row)
+
+    @property
+    def data(self):
+        # Evaluated once, like Serializer.data, so reading it twice runs one query
+        if not hasattr(self, '_data'):
+            self._data = [self.to_representation(row) for row in self.rows()]
+        return self._data
+
+
+class CommentValuesSerializer(ValuesSerializer):
+    """Fast equivalent of CommentSerializer."""
+    columns = ('id', 'text', 'timestamp', 'user__email', 'course__title')
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'text': row['text'],
+            'timestamp': self._datetime.to_representation(row['timestamp']),
+            'user_email': row['user__email'],
+            'course_title': row['course__title'],
+        }
+
+
+class CourseValuesSerializer(ValuesSerializer):
+    """Fast equivalent of CourseSerializer."""
+    columns = ('id', 'title', 'description', 'created_at', 'image', 'rating_sum', 'rating_count')
+    fields = CourseSerializer.Meta.fields
+    sparse_fields = True
+    storage = Course._meta.get_field('image').storage
+
+    def to_representation(self, row):
+        request = self.context.get('request')
+        image = row['image']
+        data = {
+            'id': row['id'],
+            'title': row['title'],
+            'description': row['description'],
+            'created_at': self._datetime.to_representation(row['created_at']),
+            'image': None,
+            'thumbnails': None,
+            'average_rating': row['rating_sum'] / row['rating_count'] if row['rating_count'] else 0,
+            'number_of_ratings': row['rating_count'],
+        }
+        if image and 'image' in self.fields:
+            url = self.storage.url(image)
+            data['image'] = request.build_absolute_uri(url) if request is not None else url
+        if 'thumbnails' in self.fields:
+            data['thumbnails'] = thumbnail_urls(self.storage, image, request)
+        if len(self.fields) < len(data):
+            return {name: data[name] for name in self.fields}
+        return data
+
+
+class ContentValuesSerializer(ValuesSerializer):
+    """Fast equivalent of the CourseContentSerializer subclasses; ``context['model']`` picks the type."""
+    columns = ('id', 'title', 'description', 'image', 'file', 'course_id')
+
+    def _url(self, storage, name):
+        url = storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def to_representation(self, row):
+        model = self.context['model']
+        image_storage = model._meta.get_field('image').storage
+        request = self.context.get('request')
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'description': row['description'],
+            'image': self._url(image_storage, row['image']) if row['image'] else None,
+            'thumbnails': thumbnail_urls(image_storage, row['image'], request),
+            'file': download_url(request, model, row['id']) if row['file'] else None,
+            'course': row['course_id'],
+        }
@@ -0,0 +1,197 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import alumni, authentication, cache, database, live, search, thumbnails
+from .models import Alumni, Comment, CustomUser, Course, Rating, CONTENT_MODELS
+from .serializers import CommentSerializer
+from .storage import ContentAddressedStorage
+
+# Which cached per-course resource each child model feeds
+CACHED_RESOURCES = {
+    Comment: cache.RESOURCE_COMMENTS,
+    Rating: cache.RESOURCE_DETAIL,
+    # Content kinds double as their cache resource names
+    **{model: model.kind for model in CONTENT_MODELS.values()},
+}
+
+
+def _invalidate(course_id, *resources):
+    # Invalidate now and again on commit, so a read racing the open transaction
+    # cannot leave pre-commit data cached
+    cache.invalidate(course_id, *resources)
+    transaction.on_commit(lambda: cache.invalidate(course_id, *resources))
+
+
+def course_content_changed(course_id, *resources):
+    # Move the course version stamp forward so conditional GETs see the change
+    Course.objects.filter(pk=course_id).touch()
+    _invalidate(course_id, *resources)
+
+
+def invalidate_course_resource(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Course):
+        return  # cascading from a course delete, which invalidate_course handles once
+    course_content_changed(instance.course_id, CACHED_RESOURCES[sender])
+
+
+for model in CACHED_RESOURCES:
+    post_save.connect(invalidate_course_resource, sender=model, dispatch_uid=f'cache-{model.__name__}-save')
+    post_delete.connect(invalidate_course_resource, sender=model, dispatch_uid=f'cache-{model.__name__}-delete')
+
+
+@receiver(post_delete, sender=Rating, dispatch_uid='rating-counters-delete')
+def release_rating(sender, instance, origin=None, **kwargs):
+    # Takes the rating back out of the course's running totals, also when a
+    # deleted user cascades to it. Clamped at zero: rows created without going
+    # through CourseDetailView.post were never counted
+    if isinstance(origin, Course):
+        return  # the course row goes with it
+    Course.objects.filter(pk=instance.course_id).update(
+        rating_sum=Greatest(F('rating_sum') - instance.rating, 0),
+        rating_count=Greatest(F('rating_count') - 1, 0),
+    )
+
+
+@receiver([post_save, post_delete], sender=Course, dispatch_uid='cache-Course')
+def invalidate_course(sender, instance, **kwargs):
+    # Course fields (e.g. the title in comment payloads) appear in every resource
+    _invalidate(instance.pk)
+
+
+# File fields whose previous value post_save handlers compare against
+TRACKED_FILE_FIELDS = {
+    Course: ('image',),
+    **{model: ('image', 'file') for model in CONTENT_MODELS.values()},
+}
+
+
+def remember_stored_files(sender, instance, using, update_fields=None, **kwargs):
+    fields = [name for name in TRACKED_FILE_FIELDS[sender] if update_fields is None or name in update_fields]
+    stored = {name: '' for name in fields}
+    if fields and not instance._state.adding:
+        stored = sender._base_manager.using(using).filter(pk=instance.pk).values(*fields).first() or stored
+    instance._stored_files = stored
+
+
+def replaced_file(instance, field):
+    """
+    The name ``field`` had before this save, '' for a new row, or None when the
+    save left it unchanged.
+    """
+    stored = getattr(instance, '_stored_files', {})
+    if field not in stored or (stored[field] or '') == (getattr(instance, field).name or ''):
+        return None
+    return stored[field] or ''
+
+
+for model in TRACKED_FILE_FIELDS:
+    pre_save.connect(remember_stored_files, sender=model, dispatch_uid=f'files-{model.__name__}')
+
+
+def count_content_file(sender, instance, **kwargs):
+    # The saved row takes its reference to the deduplicated file in its own
+    # transaction, and releases the file it replaced once that commits
+    storage = instance.file.storage
+    previous = replaced_file(instance, 'file')
+    if previous is None or not isinstance(storage, ContentAddressedStorage):
+        return
+    if instance.file:
+        storage.add_reference(instance.file.name)
+    if previous:
+        transaction.on_commit(lambda: storage.delete(previous))
+
+
+def release_content_file(sender, instance, **kwargs):
+    # Drop the deleted row's reference to its deduplicated file once the delete
+    # commits; ContentAddressedStorage removes the blob with its last reference
+    storage, name = instance.file.storage, instance.file.name
+    if name and isinstance(storage, ContentAddressedStorage):
+        transaction.on_commit(lambda: storage.delete(name))
+
+
+for model in CONTENT_MODELS.values():
+    post_save.connect(count_content_file, sender=model, dispatch_uid=f'storage-{model.__name__}-save')
+    post_delete.connect(release_content_file, sender=model, dispatch_uid=f'storage-{model.__name__}-delete')
+
+
+def _delete_thumbnails_on_commit(storage, name):
+    def delete():
+        # Rows may share an image, e.g. copied between courses
+        if not any(model.objects.filter(image=name).exists() for model in TRACKED_FILE_FIELDS):
+            thumbnails.delete_thumbnails(storage, name)
+    transaction.on_commit(delete)
+
+
+def queue_thumbnails(sender, instance, **kwargs):
+    # Only for a new image: saves that keep it would only re-check its thumbnails
+    previous = replaced_file(instance, 'image')
+    if previous is None:
+        return
+    if previous:
+        _delete_thumbnails_on_commit(instance.image.storage, previous)
+    if instance.image:
+        image = instance.image
+        transaction.on_commit(lambda: thumbnails.enqueue(image))
+
+
+def delete_thumbnails(sender, instance, **kwargs):
+    if instance.image:
+        _delete_thumbnails_on_commit(instance.image.storage, instance.image.name)
+
+
+for model in TRACKED_FILE_FIELDS:
+    post_save.connect(queue_thumbnails, sender=model, dispatch_uid=f'thumbnails-{model.__name__}')
+    post_delete.connect(delete_thumbnails, sender=model, dispatch_uid=f'thumbnails-{model.__name__}-delete')
+
+
+def update_search_index(sender, instance, **kwargs):
+    search.get_backend().index(search.kind_of(sender), instance)
+
+
+def remove_from_search_index(sender, instance, **kwargs):
+    search.get_backend().remove(search.kind_of(sender), instance.pk)
+
+
+for kind, (code, model) in search.SEARCH_KINDS.items():
+    post_save.connect(update_search_index, sender=model, dispatch_uid=f'search-{model.__name__}-save')
+    post_delete.connect(remove_from_search_index, sender=model, dispatch_uid=f'search-{model.__name__}-delete')
+
+
+@receiver(post_save, sender=Alumni, dispatch_uid='alumni-cache-save')
+@receiver(post_delete, sender=Alumni, dispatch_uid='alumni-cache-delete')
+def invalidate_alumni(sender, **kwargs):
+    # Again on commit, so a reload by another thread racing the transaction
+    # cannot keep the old rows; reloads inside a transaction are not kept
+    alumni.invalidate()
+    transaction.on_commit(alumni.invalidate)
+
+
+@receiver(post_save, sender=CustomUser, dispatch_uid='token-user-state-save')
+def update_token_user_state(sender, instance, **kwargs):
+    if instance.is_active:
+        # Reloaded on the next request, e.g. with a changed is_staff; again on
+        # commit, so a request racing the transaction cannot keep the old state
+        authentication.forget(instance.pk)
+        transaction.on_commit(lambda: authentication.forget(instance.pk))
+    else:
+        authentication.revoke(instance.pk)
+
+
+@receiver(post_delete, sender=CustomUser, dispatch_uid='token-user-state-delete')
+def revoke_deleted_token_user(sender, instance, **kwargs):
+    authentication.revoke(instance.pk)
+
+
+@receiver(post_save, sender=Comment, dispatch_uid='live-Comment')
+def publish_comment(sender, instance, created, **kwargs):
+    # Rendered once here for every open stream; nothing to do when nobody listens
+    if created and live.hub.has_subscribers(instance.course_id):
+        payload = live.render_event(CommentSerializer(instance).data)
+        transaction.on_commit(lambda: live.hub.publish(instance.course_id, instance.pk, payload))
+
+
+connection_created.connect(database.apply_sqlite_pragmas, dispatch_uid='sqlite-pragmas')
@@ -0,0 +1,125 @@
+import hashlib
+import os
+import re
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.text import slugify
+
+BLOB_DIRECTORY = 'blobs'
+# blobs/<aa>/<sha256><ext>
+BLOB_NAME = re.compile(rf'^{BLOB_DIRECTORY}/[0-9a-f]{{2}}/(?P<sha256>[0-9a-f]{{64}})(?:\.[a-z0-9]+)?$')
+BLOB_EXTENSION = re.compile(r'^\.[a-z0-9]{1,16}$')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that keeps one copy of each distinct file.
+
+    Files are stored as ``blobs/<aa>/<sha256><ext>``, named after their content
+    alone, and counted in the StoredBlob table. ``_save`` only writes a file
+    that is not stored yet; the rows using it take their reference with
+    ``add_reference`` once they are saved (see signals.py), so a row save that
+    fails holds none. ``delete`` releases one reference and removes the file
+    with the last; ``purge_unreferenced`` (``manage.py purge_blobs``) reclaims
+    the files of saves that never took one. Names outside ``blobs/`` (files stored before deduplication)
+    behave exactly as in FileSystemStorage.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Never renamed: _save derives the final name from the content, and two
+        # uploads only get the same name when they are the same file
+        return name
+
+    def _save(self, name, content):
+        StoredBlob = apps.get_model('comments', 'StoredBlob')
+
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        sha256 = digest.hexdigest()
+
+        ext = os.path.splitext(name)[1].lower()
+        blob_name = f'{BLOB_DIRECTORY}/{sha256[:2]}/{sha256}' + (ext if BLOB_EXTENSION.match(ext) else '')
+
+        with transaction.atomic():
+            blob, created = StoredBlob.objects.select_for_update().get_or_create(
+                sha256=sha256, defaults={'name': blob_name, 'references': 0}
+            )
+            if not self.exists(blob.name):
+                # Written once; a blob whose file a racing delete removed gets it back here
+                super()._save(blob.name, content)
+            elif not blob.references:
+                # Restarts the age purge_unreferenced goes by until our row takes its reference
+                os.utime(self.path(blob.name))
+        return blob.name
+
+    def add_reference(self, name):
+        """Count one more row using ``name``."""
+        match = BLOB_NAME.match(name or '')
+        if match is None:
+            return
+        StoredBlob = apps.get_model('comments', 'StoredBlob')
+        with transaction.atomic():
+            counted = StoredBlob.objects.filter(pk=match['sha256']).update(references=F('references') + 1)
+            if not counted:
+                # Released by a racing delete; _save writes the file again on the next upload
+                StoredBlob.objects.create(sha256=match['sha256'], name=name, references=1)
+
+    def delete(self, name):
+        match = BLOB_NAME.match(name or '')
+        if match is None:
+            return super().delete(name)
+
+        StoredBlob = apps.get_model('comments', 'StoredBlob')
+        with transaction.atomic():
+            StoredBlob.objects.filter(pk=match['sha256'], references__gt=0).update(references=F('references') - 1)
+            released = StoredBlob.objects.filter(pk=match['sha256'], references=0).delete()[0]
+        if released:
+            super().delete(name)
+
+    def purge_unreferenced(self, older_than):
+        """
+        Remove the blobs no row took a reference to, because the row save after
+        ``_save`` failed, once their file is older than ``older_than`` (a
+        timedelta); younger ones may belong to a save still in progress.
+        Returns the names removed.
+        """
+        StoredBlob = apps.get_model('comments', 'StoredBlob')
+        cutoff = timezone.now() - older_than
+        purged = []
+        for blob in StoredBlob.objects.filter(references=0).iterator():
+            with transaction.atomic():
+                try:
+                    blob = StoredBlob.objects.select_for_update().get(pk=blob.pk, references=0)
+                except StoredBlob.DoesNotExist:
+                    continue
+                if self.exists(blob.name):
+                    if self.get_modified_time(blob.name) > cutoff:
+                        continue
+                    super().delete(blob.name)
+                blob.delete()
+            purged.append(blob.name)
+        return purged
+
+
+def download_name(name, title):
+    """
+    The filename to offer when downloading ``name``. Blob names only carry the
+    content hash, so those are named after the row's ``title`` instead.
+    """
+    match = BLOB_NAME.match(name)
+    if match is None:
+        return os.path.basename(name)
+    return (slugify(title) or match['sha256']) + os.path.splitext(name)[1]
+
+
+def content_file_storage():
+    """Storage for CourseContent files; see CONTENT_FILE_DEDUP in settings."""
+    if settings.CONTENT_FILE_DEDUP:
+        return ContentAddressedStorage()
+    return default_storage
@@ -1,3 +1,1325 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import warnings
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.core.cache import cache as default_cache
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver
+from django.utils import timezone
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from comment_system import database
+
+from . import alumni, authentication, cache, checks, explain, live, routers, thumbnails, uploads
+from .renderers import ORJSONRenderer
+from .serializers import CommentSerializer, CommentValuesSerializer
+from .models import (
+    Alumni, CustomUser, Comment, Course, Rating, Assignment, Quizz, PastPaper, CourseMaterial, StoredBlob, UploadSession,
+)
+from .urls import urlpatterns
+
+
+@contextmanager
+def query_budget(max_queries, using=DEFAULT_DB_ALIAS):
+    """
+    Fail if the wrapped block runs more than ``max_queries`` SQL queries.
+
+    Works as a context manager or as a decorator on a test method.
+    """
+    context = CaptureQueriesContext(connections[using])
+    with context:
+        yield context
+    if len(context) > max_queries:
+        executed = "\n".join(query["sql"] for query in context.captured_queries)
+        raise AssertionError(
+            f"{len(context)} queries executed, budget is {max_queries}:\n{executed}"
+        )
+
+
+# Maximum queries for a GET on every route in comments.urls, regardless of how
+# many rows the course has. None marks routes not measured here (no GET handler,
+# per-user upload sessions or file downloads). A new route without an entry here
+# fails test_every_route_declares_a_budget.
+QUERY_BUDGETS = {
+    'signup/': None,
+    'login/': None,
+    'comments/course/<int:course_id>/': 3,
+    'comments/course/<int:course_id>/live/': None,  # long-lived stream
+    'comments/course/<int:course_id>/live/token/': None,
+    'course/<int:course_id>/': 3,
+    'course/<int:course_id>/rate/': 3,
+    'course/<int:course_id>/rate/import/': None,
+    'courses/<int:course_id>/bundle/': 8,
+    'courses/<int:course_id>/content/': 2,
+    'courses/<int:course_id>/assignments/': 2,
+    'courses/<int:course_id>/assignments/create/': None,
+    'assignments/<int:pk>/delete/': None,
+    'assignments/<int:pk>/download/': None,
+    'uploads/': None,
+    'uploads/<uuid:upload_id>/': None,
+    'uploads/<uuid:upload_id>/complete/': None,
+    'search/': 1,
+    'user/status/': 1,
+    'cache/stats/': 0,
+    'courses/<int:course_id>/quizzes/': 2,
+    'courses/<int:course_id>/quizzes/create/': None,
+    'quizzes/<int:pk>/delete/': None,
+    'quizzes/<int:pk>/download/': None,
+    'courses/<int:course_id>/pastpapers/': 2,
+    'courses/<int:course_id>/pastpapers/create/': None,
+    'pastpapers/<int:pk>/delete/': None,
+    'pastpapers/<int:pk>/download/': None,
+    'courses/<int:course_id>/coursematerials/': 2,
+    'courses/<int:course_id>/coursematerials/create/': None,
+    'coursematerials/<int:pk>/delete/': None,
+    'coursematerials/<int:pk>/download/': None,
+    'async/comments/course/<int:course_id>/': 2,
+    'async/course/<int:course_id>/': 2,
+    'async/courses/<int:course_id>/assignments/': 1,
+    'async/courses/<int:course_id>/quizzes/': 1,
+    'async/courses/<int:course_id>/pastpapers/': 1,
+    'async/courses/<int:course_id>/coursematerials/': 1,
+    'async/user/status/': 1,
+    '^courses/$': 1,
+    '^courses/(?P<pk>[^/.]+)/$': 1,
+    '': 0,
+}
+
+ROUTE_PARAMETER = re.compile(r'<[^>]+>|\(\?P<\w+>[^)]*\)')
+
+
+def iter_routes(patterns, prefix=''):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_routes(pattern.url_patterns, prefix + str(pattern.pattern))
+        elif 'format>' not in str(pattern.pattern):  # skip DRF format-suffix duplicates
+            yield prefix + str(pattern.pattern)
+
+
+class QueryBudgetTests(TestCase):
+    sizes = (1, 10)
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email="student@example.com", password="password")
+        self.user.is_staff = True
+        self.course = Course.objects.create(title="Algorithms")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def populate(self, count):
+        for index in range(count):
+            user = CustomUser.objects.create_user(email=f"user{count}-{index}@example.com", password=None)
+            Comment.objects.create(user=user, course=self.course, text=f"comment {index}")
+            Rating.objects.create(user=user, course=self.course, rating=index % 5 + 1)
+            for model in (Assignment, Quizz, PastPaper, CourseMaterial):
+                model.objects.create(course=self.course, title=f"{model.__name__} {index}")
+
+    def build_url(self, route):
+        return '/api/' + ROUTE_PARAMETER.sub(str(self.course.id), route).strip('^$')
+
+    def test_every_route_declares_a_budget(self):
+        missing = [route for route in iter_routes(urlpatterns) if route not in QUERY_BUDGETS]
+        self.assertEqual(missing, [], "Declare a query budget for new routes in QUERY_BUDGETS")
+
+    def test_get_endpoints_stay_within_budget(self):
+        for size in self.sizes:
+            self.populate(size)
+            for route, budget in QUERY_BUDGETS.items():
+                if budget is None:
+                    continue
+                with self.subTest(route=route, rows=size), query_budget(budget):
+                    response = self.client.get(self.build_url(route))
+                    self.assertEqual(response.status_code, 200)
+
+    def test_comment_listing_modes_stay_within_budget(self):
+        self.populate(10)
+        url = self.build_url('comments/course/<int:course_id>/')
+        with query_budget(3):
+            response = self.client.get(url, {'page_size': 3})
+        with query_budget(2):
+            self.client.get(response.json()['next'])
+        with query_budget(2):
+            response = self.client.get(url, {'stream': '1'})
+            b''.join(response.streaming_content)
+
+    def test_cursor_walk_returns_every_comment_once(self):
+        self.populate(10)
+        # Ties of three and four rows straddle the page boundaries, so the id tiebreak decides them
+        for index, comment in enumerate(Comment.objects.order_by('id')):
+            Comment.objects.filter(pk=comment.pk).update(timestamp=datetime(2024, 1, 1 + index // 4, tzinfo=dt_timezone.utc))
+        expected = list(Comment.objects.filter(course=self.course).order_by('-timestamp', '-id').values_list('id', flat=True))
+
+        for route in ('comments/course/<int:course_id>/', 'async/comments/course/<int:course_id>/'):
+            ids, url, params = [], self.build_url(route), {'page_size': 3}
+            while url:
+                page = self.client.get(url, params).json()
+                ids += [comment['id'] for comment in page['results']]
+                url, params = page['next'], None
+            self.assertEqual(ids, expected, route)
+
+    def test_bundle_sections(self):
+        self.populate(10)
+        url = self.build_url('courses/<int:course_id>/bundle/')
+        with query_budget(4):
+            response = self.client.get(url, {'include': 'comments,quizzes', 'comments_limit': 4})
+        self.assertEqual(set(response.json()), {'comments', 'quizzes'})
+        self.assertEqual(len(response.json()['comments']), 4)
+        self.assertEqual(len(response.json()['quizzes']), 10)
+        self.assertEqual(self.client.get(url, {'include': 'bogus'}).status_code, 400)
+
+    def test_content_listing_across_kinds(self):
+        self.populate(3)
+        url = self.build_url('courses/<int:course_id>/content/')
+        rows = self.client.get(url).json()
+        self.assertEqual(len(rows), 12)
+        self.assertEqual({row['kind'] for row in rows}, {'assignments', 'quizzes', 'pastpapers', 'coursematerials'})
+        rows = self.client.get(url, {'kind': 'quizzes'}).json()
+        self.assertEqual([row['title'] for row in rows], ['Quizz 0', 'Quizz 1', 'Quizz 2'])
+
+    def test_course_detail_ratings_options(self):
+        self.populate(10)
+        call_command('rebuild_rating_counters', stdout=StringIO())
+        url = self.build_url('course/<int:course_id>/')
+        with query_budget(2):
+            response = self.client.get(url, {'ratings': '0'})
+        self.assertNotIn('ratings', response.json())
+        self.assertEqual(response.json()['number_of_ratings'], 10)
+        self.assertEqual(response.json()['average_rating'], 3.0)
+        response = self.client.get(url, {'ratings_limit': 4, 'ratings_offset': 8})
+        self.assertEqual(len(response.json()['ratings']), 2)
+
+
+class RatingCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email="student@example.com", password="password")
+        self.course = Course.objects.create(title="Algorithms")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_rating_submission_updates_counters(self):
+        response = self.client.post(f'/api/course/{self.course.id}/rate/', {'rating': 4}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.rating_sum, self.course.rating_count), (4, 1))
+        self.assertEqual(self.client.get('/api/courses/').json()[0]['average_rating'], 4.0)
+
+    def test_duplicate_rating_is_rejected_without_touching_counters(self):
+        url = f'/api/course/{self.course.id}/rate/'
+        self.client.post(url, {'rating': 4}, format='json')
+        response = self.client.post(url, {'rating': 2}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.rating_sum, self.course.rating_count), (4, 1))
+        self.assertEqual(self.client.post('/api/course/0/rate/', {'rating': 4}, format='json').status_code, 404)
+
+    def test_bulk_import_skips_existing_ratings(self):
+        other = CustomUser.objects.create_user(email="other@example.com", password=None)
+        Rating.objects.create(course=self.course, user=self.user, rating=1)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.post(f'/api/course/{self.course.id}/rate/import/', [
+            {'email': self.user.email, 'rating': 5},
+            {'email': other.email, 'rating': 3},
+            {'email': 'missing@example.com', 'rating': 2},
+        ], format='json')
+        self.assertEqual(response.json(), {'created': 1, 'skipped': 2, 'unknown_emails': ['missing@example.com']})
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.rating_sum, self.course.rating_count), (4, 2))
+
+    def test_deleted_ratings_leave_the_counters(self):
+        other = CustomUser.objects.create_user(email="other@example.com", password=None)
+        url = f'/api/course/{self.course.id}/rate/'
+        self.client.post(url, {'rating': 4}, format='json')
+        self.client.force_authenticate(other)
+        self.client.post(url, {'rating': 2}, format='json')
+
+        Rating.objects.get(user=self.user).delete()
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.rating_sum, self.course.rating_count), (2, 1))
+        other.delete()  # cascades to the rating
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.rating_sum, self.course.rating_count), (0, 0))
+        self.assertFalse(Course.objects.with_drifted_rating_counters().exists())
+        # Never counted, so deleting it must not take the counters below zero
+        Rating.objects.create(course=self.course, user=self.user, rating=5).delete()
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.rating_sum, self.course.rating_count), (0, 0))
+
+    def test_rebuild_command_corrects_drift(self):
+        Rating.objects.create(course=self.course, user=self.user, rating=5)
+        call_command('rebuild_rating_counters', stdout=StringIO())
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.rating_sum, self.course.rating_count), (5, 1))
+
+
+class CourseResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        cache.reset_stats()
+        self.user = CustomUser.objects.create_user(email="student@example.com", password="password")
+        self.course = Course.objects.create(title="Algorithms")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_repeat_reads_are_served_from_cache(self):
+        for url in (f'/api/course/{self.course.id}/', f'/api/courses/{self.course.id}/assignments/'):
+            first = self.client.get(url).json()
+            with query_budget(0):
+                self.assertEqual(self.client.get(url).json(), first)
+        self.assertEqual(cache.get_stats()['hits'], 2)
+        self.assertEqual(cache.get_stats()['misses'], 2)
+
+    def test_child_writes_invalidate_their_resource(self):
+        url = f'/api/comments/course/{self.course.id}/'
+        self.assertEqual(self.client.get(url).json(), {'message': 'No comments yet.'})
+        self.client.post(url, {'text': 'First!'}, format='json')
+        self.assertEqual(len(self.client.get(url).json()), 1)
+
+        url = f'/api/courses/{self.course.id}/quizzes/'
+        self.assertEqual(self.client.get(url).json(), [])
+        Quizz.objects.create(course=self.course, title="Quiz 1")
+        self.assertEqual(len(self.client.get(url).json()), 1)
+
+        url = f'/api/course/{self.course.id}/'
+        self.client.get(url)
+        self.client.post(f'/api/course/{self.course.id}/rate/', {'rating': 5}, format='json')
+        self.assertEqual(self.client.get(url).json()['number_of_ratings'], 1)
+
+    @override_settings(ALLOWED_HOSTS=['api.example.com', 'mirror.example.com'])
+    def test_entries_are_kept_per_host_and_scheme(self):
+        Quizz.objects.create(course=self.course, title="Quiz 1", image='quizz/images/quiz.png')
+        url = f'/api/courses/{self.course.id}/quizzes/'
+        for host, secure in [('api.example.com', False), ('mirror.example.com', False), ('api.example.com', True)]:
+            image = self.client.get(url, HTTP_HOST=host, secure=secure).json()[0]['image']
+            self.assertEqual(image, f"{'https' if secure else 'http'}://{host}/media/quizz/images/quiz.png")
+        self.assertEqual(cache.get_stats()['misses'], 3)
+
+
+    def test_deploy_check_warns_about_a_per_process_cache(self):
+        for backend, expected in [(checks.PER_PROCESS_CACHE, ['comments.W001']),
+                                  ('django.core.cache.backends.filebased.FileBasedCache', [])]:
+            caches = {**settings.CACHES, 'course_responses': {'BACKEND': backend, 'LOCATION': self.id()}}
+            with self.settings(CACHES=caches):
+                self.assertEqual([warning.id for warning in checks.check_course_cache_is_shared(None)], expected)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email="student@example.com", password="password")
+        self.course = Course.objects.create(title="Algorithms")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_unchanged_course_returns_not_modified(self):
+        url = f'/api/courses/{self.course.id}/pastpapers/'
+        etag = self.client.get(url)['ETag']
+        with query_budget(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(ALLOWED_HOSTS=['api.example.com', 'mirror.example.com'])
+    def test_etag_varies_with_representation(self):
+        url = f'/api/courses/{self.course.id}/pastpapers/'
+        variants = [
+            self.client.get(url, HTTP_HOST='api.example.com'),
+            self.client.get(url, HTTP_HOST='mirror.example.com'),
+            self.client.get(url, HTTP_HOST='api.example.com', secure=True),
+            self.client.get(url, HTTP_HOST='api.example.com', HTTP_ACCEPT='text/html'),
+            self.client.get(url, {'format': 'api'}, HTTP_HOST='api.example.com'),
+        ]
+        self.assertEqual(len({response['ETag'] for response in variants}), len(variants))
+        etag = variants[0]['ETag']
+        response = self.client.get(url, HTTP_HOST='mirror.example.com', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(url, HTTP_HOST='api.example.com', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_child_change_moves_the_version(self):
+        url = f'/api/comments/course/{self.course.id}/'
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(user=self.user, course=self.course, text="New")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class FileDownloadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = CustomUser.objects.create_user(email="student@example.com", password="password")
+        course = Course.objects.create(title="Algorithms")
+        self.paper = PastPaper(course=course, title="Final 2023")
+        self.paper.file.save('final.pdf', ContentFile(bytes(range(256)) * 4))
+        self.url = f'/api/pastpapers/{self.paper.id}/download/'
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_listings_link_files_to_the_download_route(self):
+        course_id = self.paper.course_id
+        download = f'http://testserver{self.url}'
+        for fast in (False, True):
+            cache.clear()
+            with self.settings(FAST_JSON=fast):
+                self.assertEqual(self.client.get(f'/api/courses/{course_id}/pastpapers/').json()[0]['file'], download)
+                self.assertEqual(self.client.get(f'/api/async/courses/{course_id}/pastpapers/').json()[0]['file'], download)
+                self.assertEqual(self.client.get(f'/api/courses/{course_id}/content/').json()[0]['file'], download)
+
+    def test_full_download_streams_the_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(256)) * 4)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_byte_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-6')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(250, 256)))
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=2000-').status_code, 416)
+
+    def test_if_none_match(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_requires_authentication(self):
+        self.assertEqual(APIClient().get(self.url).status_code, 401)
+
+    @override_settings(FILE_DOWNLOAD_SENDFILE_HEADER='X-Accel-Redirect')
+    def test_accel_redirect_handoff(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.paper.file.name)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="final-2023.pdf"')
+
+    def test_filenames_are_escaped(self):
+        # A file stored before deduplication keeps its upload name
+        name = 'pastPaper/files/a "b" é.pdf'
+        os.makedirs(os.path.join(self.media_root, 'pastPaper', 'files'))
+        Path(self.media_root, name).write_bytes(b'%PDF')
+        PastPaper.objects.filter(pk=self.paper.pk).update(file=name)
+        disposition = "attachment; filename*=utf-8''a%20%22b%22%20%C3%A9.pdf"
+        self.assertEqual(self.client.get(self.url)['Content-Disposition'], disposition)
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=0-1')['Content-Disposition'], disposition)
+
+
+class ResumableUploadTests(TestCase):
+    def setUp(self):
+        media_root, upload_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.addCleanup(shutil.rmtree, upload_dir)
+        settings_override = override_settings(MEDIA_ROOT=media_root, CHUNKED_UPLOAD_DIR=upload_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = CustomUser.objects.create_user(email="student@example.com", password="password")
+        self.course = Course.objects.create(title="Algorithms")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.payload = b"lecture" * 1000
+
+    def start(self, sha256=None):
+        response = self.client.post('/api/uploads/', {
+            'kind': 'coursematerials', 'course': self.course.id, 'title': "Lecture 1",
+            'filename': 'lecture1.mp4', 'size': len(self.payload),
+            'sha256': sha256 or hashlib.sha256(self.payload).hexdigest(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return f"/api/uploads/{response.json()['id']}/"
+
+    def put(self, url, offset, chunk):
+        return self.client.put(f'{url}?offset={offset}', chunk, content_type='application/octet-stream')
+
+    def test_chunks_resume_and_complete(self):
+        url = self.start()
+        self.assertEqual(self.put(url, 0, self.payload[:4000]).json(), {'offset': 4000})
+        # A retried or out-of-order chunk is rejected with the offset to resume from
+        response = self.put(url, 1000, self.payload[1000:2000])
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 4000))
+        self.assertEqual(self.client.get(url).json()['offset'], 4000)
+        self.put(url, 4000, self.payload[4000:])
+
+        response = self.client.post(url + 'complete/')
+        self.assertEqual(response.status_code, 201)
+        material = CourseMaterial.objects.get(pk=response.json()['id'])
+        self.assertEqual(material.file.read(), self.payload)
+
+    def test_checksum_mismatch_discards_the_upload(self):
+        url = self.start(sha256='0' * 64)
+        self.put(url, 0, self.payload)
+        response = self.client.post(url + 'complete/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_abandoned_uploads_expire_and_are_purged(self):
+        url = self.start()
+        self.put(url, 0, self.payload[:1000])
+        session = UploadSession.objects.get()
+        path = uploads.partial_path(session)
+        UploadSession.objects.update(expires_at=timezone.now())
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.put(url, 1000, self.payload[1000:]).status_code, 404)
+
+        # Starting another upload removes the expired one and its partial file
+        self.start()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(UploadSession.objects.filter(pk=session.pk).exists())
+        UploadSession.objects.update(expires_at=timezone.now())
+        call_command('purge_uploads', stdout=StringIO())
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertEqual(os.listdir(settings.CHUNKED_UPLOAD_DIR), [])
+
+    def test_chunks_push_the_expiry_back(self):
+        url = self.start()
+        UploadSession.objects.update(expires_at=timezone.now() + timedelta(seconds=5))
+        self.put(url, 0, self.payload[:1000])
+        self.assertGreater(UploadSession.objects.get().expires_at, timezone.now() + timedelta(hours=1))
+
+    @override_settings(CHUNKED_UPLOAD_MAX_OPEN=2)
+    def test_open_uploads_are_capped_per_user(self):
+        first = self.start()
+        self.start()
+        response = self.client.post('/api/uploads/', {
+            'kind': 'coursematerials', 'course': self.course.id, 'title': "Lecture 3",
+            'filename': 'lecture3.mp4', 'size': 10, 'sha256': '0' * 64,
+        }, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.client.delete(first)
+        self.start()
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.course = Course.objects.create(title="Algorithms")
+
+    def add_paper(self, title, data):
+        paper = PastPaper(course=self.course, title=title)
+        paper.file.save(f'{title}.pdf', ContentFile(data))
+        return paper
+
+    def test_duplicate_uploads_share_one_blob(self):
+        first = self.add_paper('midterm', b'%PDF same bytes')
+        second = self.add_paper('midterm-copy', b'%PDF same bytes')
+        other = self.add_paper('final', b'%PDF other bytes')
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertNotEqual(first.file.name, other.file.name)
+        self.assertEqual(StoredBlob.objects.get(name=first.file.name).references, 2)
+
+    def test_blob_is_removed_with_its_last_reference(self):
+        first = self.add_paper('midterm', b'%PDF same bytes')
+        second = self.add_paper('midterm-copy', b'%PDF same bytes')
+        path = first.file.path
+        client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            client.delete(f'/api/pastpapers/{first.id}/delete/')
+        self.assertTrue(os.path.exists(path))
+        with self.captureOnCommitCallbacks(execute=True):
+            client.delete(f'/api/pastpapers/{second.id}/delete/')
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_blobs_are_named_by_content_and_downloads_by_row(self):
+        first = self.add_paper('midterm', b'%PDF same bytes')
+        second = self.add_paper('Midterm copy', b'%PDF same bytes')
+        sha256 = hashlib.sha256(b'%PDF same bytes').hexdigest()
+        self.assertEqual(first.file.name, f'blobs/{sha256[:2]}/{sha256}.pdf')
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.create_user(email="student@example.com", password=None))
+        response = client.get(f'/api/pastpapers/{second.id}/download/')
+        self.assertIn('filename="midterm-copy.pdf"', response['Content-Disposition'])
+
+    def test_replacing_a_file_releases_the_old_blob(self):
+        paper = self.add_paper('midterm', b'%PDF draft')
+        path = paper.file.path
+        with self.captureOnCommitCallbacks(execute=True):
+            paper.file.save('midterm.pdf', ContentFile(b'%PDF final'))
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(list(StoredBlob.objects.values_list('name', 'references')), [(paper.file.name, 1)])
+
+    def test_failed_row_save_holds_no_reference(self):
+        self.add_paper('midterm', b'%PDF same bytes')
+        paper = PastPaper(course=self.course, title=None)
+        paper.file.save('copy.pdf', ContentFile(b'%PDF same bytes'), save=False)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            paper.save()
+        self.assertEqual(StoredBlob.objects.get(name=paper.file.name).references, 1)
+
+    def test_purge_blobs_reclaims_files_of_failed_saves(self):
+        kept = self.add_paper('midterm', b'%PDF kept')
+        paper = PastPaper(course=self.course, title=None)
+        paper.file.save('orphan.pdf', ContentFile(b'%PDF orphan'), save=False)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            paper.save()
+        self.assertEqual(StoredBlob.objects.get(name=paper.file.name).references, 0)
+
+        call_command('purge_blobs', stdout=StringIO())
+        self.assertTrue(os.path.exists(paper.file.path))  # too young, may still be saving
+        call_command('purge_blobs', older_than=0, stdout=StringIO())
+        self.assertFalse(os.path.exists(paper.file.path))
+        self.assertTrue(os.path.exists(kept.file.path))
+        self.assertEqual(list(StoredBlob.objects.values_list('name', flat=True)), [kept.file.name])
+
+
+@override_settings(THUMBNAIL_WORKERS=0)
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_thumbnails_are_generated_after_commit_and_listed(self):
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), 'navy').save(buffer, format='PNG')
+        course = Course(title="Algorithms")
+        course.image.save('cover.png', ContentFile(buffer.getvalue()), save=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            course.save()
+
+        thumbnails = APIClient().get('/api/courses/').json()[0]['thumbnails']
+        self.assertTrue(thumbnails['small'].endswith('/media/thumbnails/small/courses/images/cover.png.webp'))
+        with Image.open(os.path.join(self.media_root, 'thumbnails', 'medium', 'courses', 'images', 'cover.png.webp')) as image:
+            self.assertEqual(image.size, (480, 320))
+
+    def png(self, color='teal', format='PNG'):
+        buffer = BytesIO()
+        Image.new('RGB', (300, 200), color).save(buffer, format=format)
+        return ContentFile(buffer.getvalue())
+
+    def test_images_differing_by_extension_keep_their_own_thumbnails(self):
+        courses = []
+        for extension, color, format in [('png', 'red', 'PNG'), ('jpg', 'blue', 'JPEG')]:
+            course = Course(title=extension)
+            course.image.save(f'cover.{extension}', self.png(color, format), save=False)
+            with self.captureOnCommitCallbacks(execute=True):
+                course.save()
+            courses.append(course)
+        red, blue = (os.path.join(self.media_root, 'thumbnails', 'small', course.image.name + '.webp') for course in courses)
+        with Image.open(red) as image:
+            self.assertGreater(image.convert('RGB').getpixel((0, 0))[0], 200)
+        with Image.open(blue) as image:
+            self.assertGreater(image.convert('RGB').getpixel((0, 0))[2], 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            courses[0].delete()
+        self.assertFalse(os.path.exists(red))
+        self.assertTrue(os.path.exists(blue))
+
+    def test_thumbnails_follow_the_image(self):
+        course = Course(title="Algorithms")
+        course.image.save('first.png', self.png(), save=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            course.save()
+        first = os.path.join(self.media_root, 'thumbnails', 'small', 'courses', 'images', 'first.png.webp')
+        self.assertTrue(os.path.exists(first))
+        # Existing thumbnails are reused without opening the original
+        os.remove(course.image.path)
+        self.assertEqual(thumbnails.generate_thumbnails(course.image.storage, course.image.name), 0)
+
+        # Saves that keep the image queue nothing
+        os.remove(first)
+        course.title = "Algorithms II"
+        with self.captureOnCommitCallbacks(execute=True):
+            course.save()
+        self.assertFalse(os.path.exists(first))
+
+        course.image.save('second.png', self.png(), save=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            course.save()
+        second = os.path.join(self.media_root, 'thumbnails', 'medium', 'courses', 'images', 'second.png.webp')
+        self.assertTrue(os.path.exists(second))
+        self.assertFalse(os.path.exists(first.replace('small', 'medium')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            course.delete()
+        self.assertFalse(os.path.exists(second))
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="student@example.com", password="password")
+        self.course = Course.objects.create(title="Operating Systems", description="Processes and threads")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, **params):
+        return self.client.get('/api/search/', params).json()['results']
+
+    def test_prefix_matching_ranks_titles_first(self):
+        other = Course.objects.create(title="Databases", description="Transactions and process isolation")
+        Comment.objects.create(user=self.user, course=other, text="The processor lecture was great")
+        results = self.search(q="proc")
+        self.assertEqual([(hit['kind'], hit['id']) for hit in results][0], ('courses', self.course.id))
+        self.assertEqual(len(results), 3)
+        self.assertEqual([hit['kind'] for hit in self.search(q="proc", kind='comments')], ['comments'])
+
+    def test_index_follows_saves_and_deletes(self):
+        material = CourseMaterial.objects.create(course=self.course, title="Scheduling slides")
+        self.assertEqual(self.search(q="schedul")[0]['id'], material.id)
+        material.title = "Paging slides"
+        material.save()
+        self.assertEqual(self.search(q="schedul"), [])
+        material.delete()
+        self.assertEqual(self.search(q="paging"), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.search(q='"threads* ('), self.search(q='threads'))
+        self.assertEqual(self.search(q='NEAR('), [])
+
+
+class CourseCatalogTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for index, title in enumerate(["Algorithms", "Algebra", "Biology", "Calculus", "Chemistry"]):
+            Course.objects.create(title=title, rating_sum=index * 4, rating_count=index and 2)
+
+    def titles(self, response):
+        rows = response.json()
+        rows = rows['results'] if isinstance(rows, dict) else rows
+        return [row['title'] for row in rows]
+
+    def test_plain_list_is_unchanged(self):
+        self.assertEqual(len(self.client.get('/api/courses/').json()), 5)
+
+    def test_filters_and_ordering(self):
+        self.assertEqual(self.titles(self.client.get('/api/courses/', {'title': 'alg'})), ["Algorithms", "Algebra"])
+        response = self.client.get('/api/courses/', {'min_rating': 4, 'ordering': '-rating_average'})
+        self.assertEqual(self.titles(response), ["Chemistry", "Calculus", "Biology"])
+        self.assertEqual(self.client.get('/api/courses/', {'created_after': 'soon'}).status_code, 400)
+
+    def test_limit_offset_and_cursor_pages(self):
+        response = self.client.get('/api/courses/', {'limit': 2, 'offset': 2, 'ordering': 'title'})
+        self.assertEqual(response.json()['count'], 5)
+        self.assertEqual(self.titles(response), ["Biology", "Calculus"])
+
+        titles, url = [], '/api/courses/?page_size=2&ordering=title'
+        while url:
+            with query_budget(1):
+                page = self.client.get(url)
+            titles += self.titles(page)
+            url = page.json()['next']
+        self.assertEqual(titles, sorted(titles))
+        self.assertEqual(len(titles), 5)
+
+    def test_cursor_pages_keep_unrated_courses(self):
+        Course.objects.create(title="Drawing")
+        Course.objects.create(title="Economics")
+        for ordering in ('-rating_average', 'rating_average'):
+            titles, url = [], f'/api/courses/?page_size=2&ordering={ordering}'
+            while url:
+                page = self.client.get(url)
+                titles += self.titles(page)
+                url = page.json()['next']
+            self.assertEqual(len(titles), 7, ordering)
+            self.assertEqual(len(set(titles)), 7, ordering)
+        self.assertEqual(titles[:3], ["Algorithms", "Drawing", "Economics"])  # unrated, then by id
+
+    def test_sparse_fieldsets(self):
+        row = self.client.get('/api/courses/', {'fields': 'id,title'}).json()[0]
+        self.assertEqual(set(row), {'id', 'title'})
+
+
+class FastJSONTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email="fast@example.com", password="pw")
+        self.client.force_authenticate(self.user)
+        self.course = Course.objects.create(title="Ünïcode \u2028 course", description='"quoted"', rating_sum=7, rating_count=2)
+        Course.objects.create(title="Second", description="")
+        for text in ["first", "tab\tand é", "last \u2029"]:
+            Comment.objects.create(user=self.user, course=self.course, text=text)
+
+    def test_renderer_matches_json_renderer(self):
+        data = {
+            "text": "é \u2028 \u2029 \x00 \\ \"",
+            "when": datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            "numbers": [1, 2.5, 1 / 3, Decimal("1.10"), None, True],
+            "nested": ({"a": []},),
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def assertSameOutput(self, url, params=None):
+        responses = []
+        for fast in (False, True):
+            cache.clear()
+            with self.settings(FAST_JSON=fast):
+                response = self.client.get(url, params)
+                content = b"".join(response.streaming_content) if response.streaming else response.content
+            self.assertEqual(response.status_code, 200)
+            responses.append(content)
+        self.assertEqual(responses[0], responses[1])
+
+    def test_values_serializer_data_is_evaluated_once(self):
+        serializer = CommentValuesSerializer(Comment.objects.filter(course=self.course))
+        with self.assertNumQueries(1):
+            self.assertIs(serializer.data, serializer.data)
+        self.assertEqual(len(serializer.data), 3)
+
+    def test_comment_lists_are_identical(self):
+        url = f"/api/comments/course/{self.course.id}/"
+        self.assertSameOutput(url)
+        self.assertSameOutput(url, {"stream": "1"})
+        self.assertSameOutput(url, {"page_size": "2"})
+
+    def test_course_lists_are_identical(self):
+        self.assertSameOutput("/api/courses/")
+        self.assertSameOutput("/api/courses/", {"fields": "id,average_rating"})
+        self.assertSameOutput("/api/courses/", {"page_size": "1", "ordering": "-rating_average"})
+        self.assertSameOutput("/api/courses/", {"limit": "1", "offset": "1"})
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("benchmark_json", rows=20, repeat=1, stdout=out)
+        self.assertEqual(out.getvalue().count("output identical"), 2)
+        self.assertEqual(Course.objects.count(), 2)
+
+
+class AlumniStatusTests(TestCase):
+    def setUp(self):
+        alumni.invalidate()
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email="l123456@lhr.nu.edu.pk", password="pw")
+
+    def login(self):
+        response = self.client.post("/api/login/", {"email": self.user.email, "password": "pw"})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+
+    def test_status_comes_from_token_claim(self):
+        Alumni.objects.create(email=self.user.email)
+        self.login()
+        # StatelessJWTAuthentication builds the user from the token's claims. The one
+        # query is user_state checking the user still exists and reading is_staff,
+        # cached for JWT_USER_STATE_TTL; the alumni status comes from the claim
+        with query_budget(1):
+            response = self.client.get("/api/user/status/")
+        self.assertEqual(response.json(), {"is_alumni": True})
+
+    def test_refresh_token_carries_no_claims(self):
+        refresh = self.client.post("/api/login/", {"email": self.user.email, "password": "pw"}).json()["refresh"]
+        self.assertNotIn(alumni.ALUMNI_CLAIM, RefreshToken(refresh))
+
+    def test_import_command(self):
+        Alumni.objects.create(email="l000001@lhr.nu.edu.pk")
+        self.assertFalse(self.user.is_alumni())
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as handle:
+            handle.write("email\nL123456@lhr.nu.edu.pk\nl000001@lhr.nu.edu.pk\nl654321@lhr.nu.edu.pk\n\n")
+        self.addCleanup(os.remove, handle.name)
+
+        out = StringIO()
+        call_command("import_alumni", handle.name, stdout=out)
+        self.assertIn("Imported 2 alumni (1 already present, 0 invalid)", out.getvalue())
+        self.assertTrue(self.user.is_alumni())
+
+        with open(handle.name, "a") as extra:
+            extra.write("someone@example.com\nl777777@lhr.nu.edu.pk\n")
+        with self.assertRaises(CommandError):
+            call_command("import_alumni", handle.name, stdout=StringIO(), stderr=StringIO())
+        self.assertFalse(Alumni.objects.filter(email="l777777@lhr.nu.edu.pk").exists())
+        call_command("import_alumni", handle.name, "--skip-invalid", stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Alumni.objects.count(), 4)
+
+
+class AlumniCacheTests(TransactionTestCase):
+    """Outside TestCase's transaction, which keeps every load from being cached."""
+
+    def setUp(self):
+        alumni.invalidate()
+        self.user = CustomUser.objects.create_user(email="l123456@lhr.nu.edu.pk", password=None)
+
+    def test_cache_follows_alumni_changes(self):
+        self.assertFalse(self.user.is_alumni())
+        row = Alumni.objects.create(email=self.user.email)
+        self.assertTrue(self.user.is_alumni())
+        with query_budget(0):
+            self.assertTrue(self.user.is_alumni())
+        row.delete()
+        self.assertFalse(self.user.is_alumni())
+
+    def test_rows_of_a_rolled_back_transaction_are_not_kept(self):
+        try:
+            with transaction.atomic():
+                Alumni.objects.create(email=self.user.email)
+                self.assertTrue(self.user.is_alumni())
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertFalse(self.user.is_alumni())
+
+
+class StatelessJWTTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        alumni.invalidate()
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email="reader@example.com", password="pw")
+        self.course = Course.objects.create(title="Stateless", description="")
+        response = self.client.post("/api/login/", {"email": self.user.email, "password": "pw"})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+
+    def test_reads_skip_the_user_query(self):
+        url = f"/api/comments/course/{self.course.id}/"
+        self.client.get(url)
+        cache.clear()
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as context:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertFalse(any('FROM "comments_customuser"' in query["sql"] for query in context.captured_queries))
+
+    def test_writes_use_the_database_user(self):
+        response = self.client.post(f"/api/comments/course/{self.course.id}/", {"text": "hello"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Comment.objects.get().user, self.user)
+
+    def test_deleted_users_are_rejected(self):
+        url = "/api/user/status/"
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.user.delete()
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_other_processes_are_caught_within_the_ttl(self):
+        url = "/api/user/status/"
+        self.assertEqual(self.client.get(url).status_code, 200)
+        pk = self.user.pk
+        self.user.delete()
+        # As cached by a process that did not see the delete
+        authentication.set_user_state(pk, True)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        with self.settings(JWT_USER_STATE_TTL=0):
+            self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_staff_access_follows_the_database(self):
+        # The token was issued before the promotion and keeps working after the demotion
+        url = "/api/cache/stats/"
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get(url).status_code, 200)
+        with query_budget(1):  # only the view's own queries; the staff state is cached
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class PasswordHashPolicyTests(TestCase):
+    def login(self, email, password="pw"):
+        return APIClient().post("/api/login/", {"email": email, "password": password})
+
+    @override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+    def test_cost_change_rehashes_on_login(self):
+        user = CustomUser.objects.create_user(email="cost@example.com", password="pw")
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$1000$"))
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.assertEqual(self.login(user.email, "wrong").status_code, 401)
+            user.refresh_from_db()
+            self.assertTrue(user.password.startswith("pbkdf2_sha256$1000$"))
+            self.assertEqual(self.login(user.email).status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$2000$"))
+
+    @override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+    def test_legacy_hash_is_upgraded_on_login(self):
+        user = CustomUser.objects.create(email="legacy@example.com", password=make_password("pw", hasher="pbkdf2_sha1"))
+        self.assertEqual(self.login(user.email).status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$1000$"))
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("benchmark_login", users=2, policies="pbkdf2-tuned", pbkdf2_iterations=1000, stdout=out)
+        self.assertIn("pbkdf2-tuned:", out.getvalue())
+        self.assertFalse(CustomUser.objects.exists())
+
+
+@override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+class UserProvisioningTests(TestCase):
+    def write(self, suffix, content):
+        with tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False) as handle:
+            handle.write(content)
+        self.addCleanup(os.remove, handle.name)
+        return handle.name
+
+    def test_import_csv_and_jsonl(self):
+        CustomUser.objects.create_user(email="existing@example.com", password="pw")
+        path = self.write(".csv", "email,password,is_staff\n"
+                                  "a@example.com,secret-a,\n"
+                                  "b@example.com,secret-b,true\n"
+                                  "existing@example.com,x,\n"
+                                  "a@example.com,again,\n"
+                                  "not-an-email,x,\n")
+        out = StringIO()
+        call_command("import_users", path, workers=2, batch_size=2, stdout=out, stderr=StringIO())
+        self.assertIn("Created 2 user(s); 2 skipped as existing or duplicate, 1 invalid", out.getvalue())
+        self.assertTrue(CustomUser.objects.get(email="a@example.com").check_password("secret-a"))
+        self.assertTrue(CustomUser.objects.get(email="b@example.com").is_staff)
+
+        path = self.write(".jsonl", '{"email": "c@example.com", "password": "secret-c"}\n\n{"email": "d@example.com"}\n')
+        call_command("import_users", path, workers=0, stdout=StringIO())
+        self.assertTrue(CustomUser.objects.get(email="c@example.com").check_password("secret-c"))
+        self.assertFalse(CustomUser.objects.get(email="d@example.com").has_usable_password())
+
+    def test_delete_all_users_in_batches(self):
+        course = Course.objects.create(title="Rated", description="")
+        staff = CustomUser.objects.create_superuser(email="admin@example.com", password="pw")
+        for index in range(5):
+            user = CustomUser.objects.create_user(email=f"user{index}@example.com", password="pw")
+            Rating.objects.create(course=course, user=user, rating=4)
+        Rating.objects.create(course=course, user=staff, rating=2)
+        Course.objects.rebuild_rating_counters()
+
+        call_command("delete_all_users", batch_size=2, keep_staff=True, stdout=StringIO())
+        self.assertEqual(list(CustomUser.objects.all()), [staff])
+        course.refresh_from_db()
+        self.assertEqual((course.rating_sum, course.rating_count), (2, 1))
+
+        call_command("delete_all_users", stdout=StringIO())
+        self.assertFalse(CustomUser.objects.exists())
+
+
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        alumni.invalidate()
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email="async@example.com", password="pw")
+        self.course = Course.objects.create(title="Async", description="Concurrency")
+        for index in range(3):
+            Comment.objects.create(user=self.user, course=self.course, text=f"comment {index}")
+            Rating.objects.create(course=self.course, user=CustomUser.objects.create_user(
+                email=f"rater{index}@example.com", password=None), rating=index + 2)
+            Quizz.objects.create(course=self.course, title=f"Quizz {index}")
+        Course.objects.rebuild_rating_counters()
+        response = self.client.post("/api/login/", {"email": self.user.email, "password": "pw"})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+
+    def assertSameAsSync(self, route, params=None):
+        cache.clear()
+        sync = self.client.get(f"/api/{route}", params)
+        cache.clear()
+        response = self.client.get(f"/api/async/{route}", params)
+        self.assertEqual(response.status_code, sync.status_code)
+        # Only pagination links differ, as they point back at the view that served them
+        self.assertEqual(response.content.replace(b"/api/async/", b"/api/"), sync.content)
+        return response
+
+    def test_responses_match_the_sync_views(self):
+        course_id = self.course.id
+        self.assertSameAsSync(f"course/{course_id}/")
+        self.assertSameAsSync(f"course/{course_id}/", {"ratings_limit": 2, "ratings_offset": 1})
+        self.assertSameAsSync(f"course/{course_id}/", {"ratings": "0"})
+        self.assertSameAsSync(f"course/{course_id + 1}/")
+        self.assertSameAsSync(f"comments/course/{course_id}/")
+        page = self.assertSameAsSync(f"comments/course/{course_id}/", {"page_size": 2}).json()
+        self.assertSameAsSync(f"comments/course/{course_id}/", {"page_size": 2, "cursor": page["next"].split("cursor=")[1]})
+        self.assertSameAsSync(f"comments/course/{course_id + 1}/")
+        for kind in ("assignments", "quizzes", "pastpapers", "coursematerials"):
+            self.assertSameAsSync(f"courses/{course_id}/{kind}/")
+        self.assertSameAsSync("user/status/")
+
+    def test_stream_and_cache_are_shared(self):
+        url = f"comments/course/{self.course.id}/"
+        streamed = self.client.get(f"/api/async/{url}", {"stream": "1"})
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # consuming an async stream under WSGI warns
+            self.assertEqual(b"".join(streamed), self.client.get(f"/api/{url}").content)
+        # Cached by the sync view above, so served without touching the comments table
+        with query_budget(0):
+            self.assertEqual(self.client.get(f"/api/async/{url}").status_code, 200)
+
+    def test_authentication(self):
+        url = f"/api/async/comments/course/{self.course.id}/"
+        anonymous = APIClient()
+        response = anonymous.get(url)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.content, anonymous.get(f"/api/comments/course/{self.course.id}/").content)
+        self.assertEqual(anonymous.get(f"/api/async/courses/{self.course.id}/quizzes/").status_code, 200)
+        anonymous.credentials(HTTP_AUTHORIZATION="Bearer not-a-token")
+        self.assertEqual(anonymous.get(url).status_code, 401)
+
+
+class LiveCommentFeedTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email="live@example.com", password="pw")
+        self.client.force_authenticate(self.user)
+        self.course = Course.objects.create(title="Live", description="Lecture")
+        self.comments = [
+            Comment.objects.create(user=self.user, course=self.course, text=f"comment {index}") for index in range(3)
+        ]
+
+    def event(self, comment):
+        return live.format_event(comment.id, live.render_event(CommentSerializer(comment).data)).encode()
+
+    @override_settings(LIVE_FEED_MAX_DURATION=0.05)
+    def test_reconnect_replays_missed_comments(self):
+        first, second, third = self.comments
+        url = f"/api/comments/course/{self.course.id}/live/"
+        for params, headers in (({}, {"HTTP_LAST_EVENT_ID": str(first.id)}), ({"last_id": first.id}, {})):
+            response = self.client.get(url, params, **headers)
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")  # consuming an async stream under WSGI warns
+                body = b"".join(response)
+            self.assertEqual(body, f"retry: {live.RETRY_MS}\n\n".encode() + self.event(second) + self.event(third))
+        self.assertFalse(live.hub.has_subscribers(self.course.id))
+
+    def test_errors(self):
+        url = f"/api/comments/course/{self.course.id}/live/"
+        self.assertEqual(self.client.get(url, HTTP_LAST_EVENT_ID="abc").status_code, 400)
+        self.assertEqual(self.client.get(f"/api/comments/course/{self.course.id + 1}/live/").status_code, 404)
+        self.assertEqual(APIClient().get(url).status_code, 401)
+
+    @override_settings(LIVE_FEED_MAX_DURATION=0.05)
+    def test_event_source_authenticates_with_a_feed_token(self):
+        url = f"/api/comments/course/{self.course.id}/live/"
+        response = self.client.post(f"{url}token/")
+        self.assertEqual(response.json()["expires_in"], 60)
+        token = response.json()["token"]
+
+        browser = APIClient()
+        response = browser.get(url, {"token": token, "last_id": self.comments[-1].id})
+        self.assertEqual(response.status_code, 200)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # consuming an async stream under WSGI warns
+            b"".join(response)
+        other = Course.objects.create(title="Other")
+        self.assertEqual(browser.get(f"/api/comments/course/{other.id}/live/", {"token": token}).status_code, 401)
+        self.assertEqual(browser.get(url, {"token": token + "x"}).status_code, 401)
+        with self.settings(LIVE_FEED_TOKEN_LIFETIME=-1):
+            self.assertEqual(browser.get(url, {"token": token}).status_code, 401)
+        self.assertEqual(APIClient().post(f"{url}token/").status_code, 401)
+        self.assertEqual(self.client.post(f"/api/comments/course/{other.id + 1}/live/token/").status_code, 404)
+
+    def test_new_comments_fan_out_to_every_subscriber(self):
+        def post_comment():
+            with self.captureOnCommitCallbacks(execute=True):
+                return Comment.objects.create(user=self.user, course=self.course, text="live")
+
+        async def listen():
+            feeds = [live.comment_events(self.course.id) for _ in range(2)]
+            for feed in feeds:
+                await feed.__anext__()  # the retry hint, sent once subscribed
+            comment = await sync_to_async(post_comment)()
+            events = [await feed.__anext__() for feed in feeds]
+            for feed in feeds:
+                await feed.aclose()
+            return comment, events
+
+        comment, events = async_to_sync(listen)()
+        self.assertEqual(events, [self.event(comment).decode()] * 2)
+        self.assertFalse(live.hub.has_subscribers(self.course.id))
+
+    @override_settings(LIVE_FEED_QUEUE_SIZE=1)
+    def test_slow_subscriber_is_disconnected(self):
+        async def overflow():
+            subscription = live.hub.subscribe(self.course.id)
+            live.hub.publish(self.course.id, 1, "{}")
+            live.hub.publish(self.course.id, 2, "{}")
+            await asyncio.sleep(0)
+            live.hub.unsubscribe(subscription)
+            return await subscription.get()
+
+        self.assertIsNone(async_to_sync(overflow)())
+
+
+class AsyncBenchmarkTests(TransactionTestCase):
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("benchmark_asgi", clients=4, requests=2, comments=3, wsgi_threads=2, stdout=out)
+        self.assertEqual(out.getvalue().count(", 0 error(s) over 8 requests"), 2)
+        self.assertFalse(Course.objects.exists())
+
+
+class DatabaseConfigTests(TestCase):
+    def test_config_from_environment(self):
+        base_dir = Path("/srv/app")
+        sqlite = database.database_config(base_dir, {})
+        self.assertEqual(sqlite["NAME"], str(base_dir / "db.sqlite3"))
+        self.assertEqual(sqlite["PRAGMAS"], database.SQLITE_TUNED_PRAGMAS)
+        self.assertEqual(sqlite["OPTIONS"], {"timeout": 5})
+        self.assertEqual(database.database_config(base_dir, {"SQLITE_TUNING": "0"})["PRAGMAS"], {})
+
+        postgres = database.database_config(base_dir, {
+            "DATABASE_ENGINE": "postgres", "DATABASE_NAME": "courses", "DATABASE_HOST": "db",
+            "DATABASE_CONN_MAX_AGE": "300", "DATABASE_POOLER": "pgbouncer",
+        })
+        self.assertEqual(postgres["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual((postgres["NAME"], postgres["HOST"], postgres["CONN_MAX_AGE"]), ("courses", "db", 300))
+        self.assertTrue(postgres["CONN_HEALTH_CHECKS"])
+        self.assertTrue(postgres["DISABLE_SERVER_SIDE_CURSORS"])
+        with self.assertRaises(ImproperlyConfigured):
+            database.database_config(base_dir, {"DATABASE_ENGINE": "oracle"})
+
+    def test_pragmas_are_applied_on_connect(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        config = database.database_config(Path(directory), {"SQLITE_BUSY_TIMEOUT": "2500"})
+        wrapper = DatabaseWrapper(connections.configure_settings({"default": config})["default"])
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        raw = wrapper.connection
+        self.assertEqual(raw.execute("PRAGMA journal_mode").fetchone(), ("wal",))
+        self.assertEqual(raw.execute("PRAGMA synchronous").fetchone(), (1,))  # NORMAL
+        self.assertEqual(raw.execute("PRAGMA busy_timeout").fetchone(), (2500,))
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("benchmark_db_writes", writers=2, readers=1, writes=5, stdout=out)
+        rates = re.findall(r"^(default|tuned): (\d+) writes/s", out.getvalue(), re.MULTILINE)
+        self.assertEqual([profile for profile, _ in rates], ["default", "tuned"])
+        self.assertTrue(all(int(rate) > 0 for _, rate in rates), out.getvalue())
+        self.assertNotIn("benchmark_default", connections.settings)
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """A scratch SQLite file stands in for the replica of the test database."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        config = database.sqlite_database(os.path.join(cls.directory, "replica.sqlite3"), {})
+        connections.settings["replica"] = connections.configure_settings({"default": config})["default"]
+        call_command("migrate", database="replica", verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections["replica"].close()
+        del connections.settings["replica"]
+        shutil.rmtree(cls.directory)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        default_cache.clear()
+        call_command("flush", database="replica", interactive=False, verbosity=0)
+        self.enterContext(override_settings(DATABASE_REPLICAS=["replica"]))
+        self.user = CustomUser.objects.create_user(email="writer@example.com", password=None)
+        self.course = Course.objects.create(title="Replicated", description="Lag")
+        # Replicated before any comments were written
+        CustomUser.objects.using("replica").bulk_create([self.user])
+        Course.objects.using("replica").bulk_create([self.course])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_router(self):
+        router = routers.PrimaryReplicaRouter()
+        self.assertIsNone(router.db_for_read(Comment))  # outside a request
+        with routers.request_scope():
+            self.assertEqual(router.db_for_read(Comment), "replica")
+            self.assertIsNone(router.db_for_read(Group))
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Comment), "default")
+            self.assertEqual(router.db_for_write(Comment), "default")
+            self.assertEqual(router.db_for_read(Comment), "default")  # sticky for the rest of the request
+        self.assertFalse(router.allow_migrate("replica", "comments"))
+        self.assertIsNone(router.allow_migrate("default", "comments"))
+
+    def test_router_leaves_other_apps_and_databases_alone(self):
+        router = routers.PrimaryReplicaRouter()
+        scratch = Course(title="Scratch")
+        scratch._state.db = "scratch"
+        with routers.request_scope():
+            self.assertIsNone(router.db_for_write(Group))
+            self.assertEqual(router.db_for_write(Course, instance=scratch), "scratch")
+            self.assertEqual(router.db_for_read(Course, instance=scratch), "scratch")
+        self.assertTrue(router.allow_relation(self.course, Course.objects.using("replica").get()))
+        self.assertFalse(router.allow_relation(self.course, scratch))
+
+    def test_benchmark_command_with_a_replica_configured(self):
+        out = StringIO()
+        call_command("benchmark_db_writes", writers=2, readers=1, writes=5, stdout=out)
+        rates = [int(rate) for rate in re.findall(r"(\d+) writes/s", out.getvalue())]
+        self.assertEqual(len(rates), 2)
+        self.assertTrue(all(rate > 0 for rate in rates), out.getvalue())
+
+    def test_reads_follow_the_users_own_writes(self):
+        url = f"/api/comments/course/{self.course.id}/"
+        self.assertEqual(self.client.get(url).json(), {"message": "No comments yet."})
+
+        response = self.client.post(url, {"text": "Visible to me at once"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.get(url).json()[0]["text"], "Visible to me at once")
+        # In the cache shared by all workers, not in this process's default cache
+        pin = routers.PIN_KEY.format(user_id=self.user.pk)
+        self.assertTrue(routers.pin_cache().get(pin))
+        self.assertIsNone(default_cache.get(pin))
+
+        # Once the pin expires reads return to the (here never caught up) replica
+        cache.clear()
+        routers.pin_cache().delete(pin)
+        self.assertEqual(self.client.get(url).json(), {"message": "No comments yet."})
+
+    def test_lagging_replica_reads_are_not_served_to_the_writer(self):
+        url = f"/api/comments/course/{self.course.id}/"
+        etag = self.client.get(url)["ETag"]
+        reader = CustomUser.objects.create_user(email="reader@example.com", password=None)
+        CustomUser.objects.using("replica").bulk_create([reader])
+        other = APIClient()
+        other.force_authenticate(reader)
+
+        self.client.post(url, {"text": "Mine"}, format="json")
+        # Another user reads the replica, which has not seen the comment yet
+        cache.reset_stats()
+        self.assertEqual(other.get(url).json(), {"message": "No comments yet."})
+        self.assertEqual(other.get(url).json(), {"message": "No comments yet."})
+        self.assertEqual(cache.get_stats()["hits"], 0)  # neither read was cached
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["text"], "Mine")
+
+
+class IndexAuditTests(TestCase):
+    def scans(self, queryset):
+        return explain.full_scans(connections[DEFAULT_DB_ALIAS], *queryset.query.sql_with_params())
+
+    def test_plans(self):
+        self.assertEqual(self.scans(Course.objects.filter(description="x")), [("comments_course", "SCAN comments_course")])
+        self.assertEqual(self.scans(Course.objects.all()), [])  # listing everything is not a missed index
+        self.assertEqual(self.scans(Course.objects.filter(created_at__gte=datetime(2024, 1, 1, tzinfo=dt_timezone.utc))
+                                    .order_by("-created_at")), [])
+        self.assertEqual(self.scans(Rating.objects.filter(course_id=1).order_by("id")), [])
+        self.assertEqual(self.scans(Comment.objects.filter(course_id=1, id__gt=5).order_by("id")), [])
+
+    def test_every_route_is_served_by_an_index(self):
+        out = StringIO()
+        call_command("audit_indexes", fail=True, stdout=out)
+        self.assertRegex(out.getvalue(), r"\d+ queries over \d+ requests, 0 filtered full table scan\(s\)")
+        self.assertFalse(Course.objects.exists())  # sample rows are rolled back
@@ -0,0 +1,123 @@
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIRECTORY = 'thumbnails'
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+
+
+def thumbnail_name(name, size):
+    # Derived from the full source name, so URLs can be built without a lookup
+    # and images differing only by extension (a.png, a.jpg) keep their own
+    return f'{THUMBNAIL_DIRECTORY}/{size}/{name}.webp'
+
+
+def thumbnail_urls(storage, name, request=None):
+    """
+    Map each configured size to the URL of its WebP thumbnail, or every size to
+    None without an image.
+
+    URLs are derived from the name without asking the storage whether the file
+    exists yet, so listing rows costs no storage calls. Until the background job
+    has written a thumbnail its URL answers 404 and clients fall back to the
+    original.
+    """
+    urls = {}
+    for size in settings.THUMBNAIL_SIZES:
+        if name:
+            url = storage.url(thumbnail_name(name, size))
+            urls[size] = request.build_absolute_uri(url) if request is not None else url
+        else:
+            urls[size] = None
+    return urls
+
+
+def generate_thumbnails(storage, name, overwrite=False):
+    """Write every configured size of ``name``; returns the number written."""
+    sizes = {
+        size: dimensions for size, dimensions in settings.THUMBNAIL_SIZES.items()
+        if overwrite or not storage.exists(thumbnail_name(name, size))
+    }
+    if not sizes:
+        return 0  # without opening and decoding the original
+
+    written = 0
+    with storage.open(name, 'rb') as source:
+        original = Image.open(source)
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+
+    for size, dimensions in sizes.items():
+        derivative = thumbnail_name(name, size)
+        if storage.exists(derivative):
+            storage.delete(derivative)
+        image = original.copy()
+        image.thumbnail(dimensions)
+        buffer = io.BytesIO()
+        image.save(buffer, format='WEBP', quality=settings.THUMBNAIL_QUALITY)
+        storage.save(derivative, ContentFile(buffer.getvalue()))
+        written += 1
+    return written
+
+
+def delete_thumbnails(storage, name):
+    """Remove every configured size of ``name``, e.g. after its image was replaced or deleted."""
+    for size in settings.THUMBNAIL_SIZES:
+        storage.delete(thumbnail_name(name, size))
+
+
+def _run(storage, name):
+    try:
+        generate_thumbnails(storage, name)
+    except Exception:
+        logger.exception("Could not generate thumbnails for %s", name)
+    finally:
+        _pending.discard(name)
+
+
+def _run_in_worker(storage, name):
+    try:
+        _run(storage, name)
+    finally:
+        # Each worker thread has its own DB connections; close them between jobs
+        connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS, thread_name_prefix='thumbnails'
+            )
+    return _executor
+
+
+def enqueue(field_file):
+    """
+    Generate thumbnails for ``field_file`` off the request path.
+
+    Jobs run on a small thread pool (THUMBNAIL_WORKERS, or inline when 0) and
+    the same file is never queued twice. Jobs still queued when the process
+    exits are lost; ``manage.py generate_thumbnails`` fills any gaps.
+    """
+    name = field_file.name
+    if not name or name in _pending:
+        return
+    _pending.add(name)
+    if settings.THUMBNAIL_WORKERS:
+        _get_executor().submit(_run_in_worker, field_file.storage, name)
+    else:
+        _run(field_file.storage, name)
@@ -0,0 +1,75 @@
+import hashlib
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class AssembledFile(File):
+    """
+    A finished upload on local disk.
+
+    Exposing ``temporary_file_path`` lets FileSystemStorage move the file into
+    place instead of copying it.
+    """
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def partial_path(session):
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{session.pk}.part')
+
+
+def create_partial(session):
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    open(partial_path(session), 'wb').close()
+
+
+def write_chunk(session, offset, stream, length):
+    """
+    Copy ``length`` bytes from ``stream`` into the partial file at ``offset``.
+
+    The chunk is copied in small blocks so the request body is never held in
+    memory. Returns the number of bytes written. Callers hold the session row
+    locked, so no other request truncates the file in between.
+    """
+    written = 0
+    with open(partial_path(session), 'r+b') as handle:
+        handle.seek(offset)
+        while written < length:
+            block = stream.read(min(UPLOAD_CHUNK_SIZE, length - written))
+            if not block:
+                break
+            handle.write(block)
+            written += len(block)
+        # Drop anything past the new end, e.g. from an earlier interrupted chunk
+        handle.truncate(offset + written)
+    return written
+
+
+def sha256_of(session):
+    digest = hashlib.sha256()
+    with open(partial_path(session), 'rb') as handle:
+        for block in iter(lambda: handle.read(UPLOAD_CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def discard_partial(session):
+    try:
+        os.remove(partial_path(session))
+    except FileNotFoundError:
+        pass
+
+
+def purge_expired():
+    """Delete expired upload sessions and their partial files. Returns how many."""
+    UploadSession = apps.get_model('comments', 'UploadSession')
+    expired = list(UploadSession.objects.expired().only('pk'))
+    for session in expired:
+        discard_partial(session)
+    UploadSession.objects.filter(pk__in=[session.pk for session in expired]).delete()
+    return len(expired)
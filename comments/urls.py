@@ -1,42 +1,75 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import SignupView, LoginView, CommentView, CourseViewSet, CourseDetailView,AssignmentListView,AssignmentCreateView,AssignmentDeleteView
-from .views import UserStatusView
-from .views import PastPaperListView,PastPaperDeleteView,PastPaperCreateView
-from .views import QuizzCreateView,QuizzDeleteView,QuizzListView
-from .views import CourseMaterialCreateView,CourseMaterialDeleteView,CourseMaterialListView
+from .views import SignupView, LoginView, CommentView, CourseViewSet, CourseDetailView
+from .views import UserStatusView, RatingImportView, CacheStatsView, CourseBundleView, LiveFeedTokenView
+from .views import CourseContentViewSet, CourseContentListView
+from .views import UploadSessionView, UploadSessionDetailView, UploadSessionCompleteView
+from .views import SearchView
+from .async_views import AsyncCommentFeedView, AsyncCommentView, AsyncCourseContentView, AsyncCourseDetailView, AsyncUserStatusView
+from .models import CONTENT_MODELS
 # Initialize the router
 router = DefaultRouter()
 router.register('courses', CourseViewSet, basename='course')
 
+# One generic viewset serves every content type; kind selects the model
+def content_view(kind, actions):
+    return CourseContentViewSet.as_view(actions, kind=kind)
+
 # Define the urlpatterns
 urlpatterns = [
     path('signup/', SignupView.as_view()),
     path('login/', LoginView.as_view()),
     path('comments/course/<int:course_id>/', CommentView.as_view()),  # Comments for a specific course
+    path('comments/course/<int:course_id>/live/', AsyncCommentFeedView.as_view(), name='comment-feed'),  # New comments as server-sent events
+    path('comments/course/<int:course_id>/live/token/', LiveFeedTokenView.as_view(), name='comment-feed-token'),  # ?token= for EventSource
     path('course/<int:course_id>/', CourseDetailView.as_view()),  # Course Detail API
     path('course/<int:course_id>/rate/', CourseDetailView.as_view()),  # Rating submission API
+    path('course/<int:course_id>/rate/import/', RatingImportView.as_view(), name='rating-import'),  # Bulk rating import
+
+    path('courses/<int:course_id>/bundle/', CourseBundleView.as_view(), name='course-bundle'),  # Course page in one request
+    path('courses/<int:course_id>/content/', CourseContentListView.as_view(), name='list_content'),  # All content types
+
+    path('courses/<int:course_id>/assignments/', content_view('assignments', {'get': 'list'}), name='list_assignments'),
+    path('courses/<int:course_id>/assignments/create/', content_view('assignments', {'post': 'create'}), name='create_assignment'),
+    path('assignments/<int:pk>/delete/', content_view('assignments', {'delete': 'destroy'}), name='assignment-delete'),
+    path('assignments/<int:pk>/download/', content_view('assignments', {'get': 'download'}), name='assignment-download'),
 
-    path('courses/<int:course_id>/assignments/', AssignmentListView.as_view(), name='list_assignments'),
-    path('courses/<int:course_id>/assignments/create/', AssignmentCreateView.as_view(), name='create_assignment'),
-    path('assignments/<int:pk>/delete/', AssignmentDeleteView.as_view(), name='assignment-delete'),
+    # Resumable uploads: POST to start, PUT chunks, POST complete/
+    path('uploads/', UploadSessionView.as_view(), name='upload-create'),
+    path('uploads/<uuid:upload_id>/', UploadSessionDetailView.as_view(), name='upload-detail'),
+    path('uploads/<uuid:upload_id>/complete/', UploadSessionCompleteView.as_view(), name='upload-complete'),
+
+    path('search/', SearchView.as_view(), name='search'),  # Full-text search over courses, content and comments
 
     path('user/status/', UserStatusView.as_view(), name='user-status'),
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+
+     path('courses/<int:course_id>/quizzes/', content_view('quizzes', {'get': 'list'}), name='list_quizz'),
+    path('courses/<int:course_id>/quizzes/create/', content_view('quizzes', {'post': 'create'}), name='create_quizz'),
+    path('quizzes/<int:pk>/delete/', content_view('quizzes', {'delete': 'destroy'}), name='quizz-delete'),
+    path('quizzes/<int:pk>/download/', content_view('quizzes', {'get': 'download'}), name='quizz-download'),
 
-     path('courses/<int:course_id>/quizzes/', QuizzListView.as_view(), name='list_quizz'),
-    path('courses/<int:course_id>/quizzes/create/', QuizzCreateView.as_view(), name='create_quizz'),
-    path('quizzes/<int:pk>/delete/', QuizzDeleteView.as_view(), name='quizz-delete'),
 
+     path('courses/<int:course_id>/pastpapers/', content_view('pastpapers', {'get': 'list'}), name='list_pastpaper'),
+    path('courses/<int:course_id>/pastpapers/create/', content_view('pastpapers', {'post': 'create'}), name='create_pastpaper'),
+    path('pastpapers/<int:pk>/delete/', content_view('pastpapers', {'delete': 'destroy'}), name='pastpaper-delete'),
+    path('pastpapers/<int:pk>/download/', content_view('pastpapers', {'get': 'download'}), name='pastpaper-download'),
 
-     path('courses/<int:course_id>/pastpapers/', PastPaperListView.as_view(), name='list_pastpaper'),
-    path('courses/<int:course_id>/pastpapers/create/', PastPaperCreateView.as_view(), name='create_pastpaper'),
-    path('pastpapers/<int:pk>/delete/', PastPaperDeleteView.as_view(), name='pastpaper-delete'),
 
+path('courses/<int:course_id>/coursematerials/', content_view('coursematerials', {'get': 'list'}), name='list_coursematerial'),
+    path('courses/<int:course_id>/coursematerials/create/', content_view('coursematerials', {'post': 'create'}), name='create_coursematerial'),
+    path('coursematerials/<int:pk>/delete/', content_view('coursematerials', {'delete': 'destroy'}), name='coursematerial-delete'),
+    path('coursematerials/<int:pk>/download/', content_view('coursematerials', {'get': 'download'}), name='coursematerial-download'),
 
-path('courses/<int:course_id>/coursematerials/', CourseMaterialListView.as_view(), name='list_coursematerial'),
-    path('courses/<int:course_id>/coursematerials/create/', CourseMaterialCreateView.as_view(), name='create_coursematerial'),
-    path('coursematerials/<int:pk>/delete/', CourseMaterialDeleteView.as_view(), name='coursematerial-delete'),
 
+    # Async (ASGI-native) versions of the read paths above, with identical responses
+    path('async/comments/course/<int:course_id>/', AsyncCommentView.as_view(), name='async-comments'),
+    path('async/course/<int:course_id>/', AsyncCourseDetailView.as_view(), name='async-course-detail'),
+    *[
+        path(f'async/courses/<int:course_id>/{kind}/', AsyncCourseContentView.as_view(kind=kind), name=f'async-list-{kind}')
+        for kind in CONTENT_MODELS
+    ],
+    path('async/user/status/', AsyncUserStatusView.as_view(), name='async-user-status'),
 
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,29 +1,46 @@
-from rest_framework import status, viewsets  # Import viewsets here
+from rest_framework import mixins, status, viewsets  # Import viewsets here
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
 from django.contrib.auth import authenticate
-from rest_framework.permissions import IsAuthenticated
-from .models import CustomUser, Comment, Course, Rating, Assignment, Alumni, Quizz, PastPaper, CourseMaterial
+from django.db import IntegrityError, transaction
+from django.db.models import CharField, F, FloatField, Prefetch, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from .models import CustomUser, Comment, Course, Rating, UploadSession, CONTENT_MODELS, upload_session_expiry
 from .serializers import (
     UserSerializer, 
     CommentSerializer, 
     CourseSerializer, 
     CourseDetailSerializer, 
     RatingSerializer,
-    AssignmentSerializer,
-    QuizzSerializer,
-    PastPaperSerializer,
-    CourseMaterialSerializer
+    RatingImportSerializer,
+    ContentSummarySerializer,
+    UploadSessionSerializer,
+    CommentValuesSerializer,
+    CourseValuesSerializer,
+    CONTENT_SERIALIZERS,
 )
 from rest_framework.parsers import MultiPartParser, FormParser  # Allow file uploads
-from rest_framework import generics
+from .pagination import KeysetPagination, OptionalPagination, parse_limit_offset, stream_json_list
+from .filters import CourseFilterBackend, StableOrderingFilter
+from . import cache
+from .cache import cache_course_response
+from .conditional import course_condition
+from .downloads import file_download_response
+from .storage import download_name
+from . import alumni, search, uploads
+from .authentication import add_user_claims, live_feed_token
 
 # Constants
 COURSE_NOT_FOUND_MESSAGE = {"error": "Course not found"}
 STATUS_NOT_FOUND = status.HTTP_404_NOT_FOUND
 RATING_ERROR_MESSAGE = {"error": "Rating must be between 1 and 5"}
 ALREADY_RATED_ERROR_MESSAGE = {"error": "You have already rated this course"}
+RATING_IMPORT_BATCH_SIZE = 500
+UPLOAD_NOT_FOUND_MESSAGE = {"error": "Upload not found"}
+SEARCH_DEFAULT_LIMIT = 20
 
 class SignupView(APIView):
     def post(self, request):
@@ -42,9 +59,14 @@ class LoginView(APIView):
 
         if user:
             refresh = RefreshToken.for_user(user)
+            access = refresh.access_token
+            # So read requests need no user lookup. Not on the refresh token: the
+            # claims are fixed at login, and access tokens refreshed from it
+            # should load the user rather than repeat a stale alumni status
+            add_user_claims(access, user)
             return Response({
                 "refresh": str(refresh),
-                "access": str(refresh.access_token),
+                "access": str(access),
             })
         return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
 
@@ -52,14 +74,37 @@ class LoginView(APIView):
 class CommentView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @course_condition
+    @cache_course_response(cache.RESOURCE_COMMENTS)
     def get(self, request, course_id):
         try:
             course = Course.objects.get(id=course_id)
-            comments = Comment.objects.filter(course=course).order_by("-timestamp")
-            if not comments.exists():
+            # select_related keeps user_email/course_title from costing two queries per comment
+            comments = (
+                Comment.objects.filter(course=course)
+                .select_related("user", "course")
+                .order_by("-timestamp", "-id")
+            )
+            serializer_class = CommentSerializer
+            if settings.FAST_JSON:
+                serializer_class = CommentValuesSerializer
+                comments = comments.values(*CommentValuesSerializer.columns)
+
+            # ?stream=1 returns the same list as below without buffering it in memory
+            if request.query_params.get("stream") in ("1", "true"):
+                return stream_json_list(comments, serializer_class)
+
+            # ?page_size= / ?cursor= switch to keyset pagination on (timestamp, id)
+            if KeysetPagination.is_requested(request):
+                paginator = KeysetPagination()
+                page = paginator.paginate_queryset(comments, request)
+                serializer = serializer_class(page, many=True)
+                return Response(paginator.get_paginated_data(serializer.data), status=status.HTTP_200_OK)
+
+            data = serializer_class(comments, many=True).data
+            if not data:
                 return Response({"message": "No comments yet."}, status=status.HTTP_200_OK)
-            serializer = CommentSerializer(comments, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return Response(data, status=status.HTTP_200_OK)
         except Course.DoesNotExist:
             return Response(COURSE_NOT_FOUND_MESSAGE, status=STATUS_NOT_FOUND)
 
@@ -76,9 +121,33 @@ class CommentView(APIView):
 
 
 class CourseViewSet(viewsets.ModelViewSet):
-    queryset = Course.objects.all()
     serializer_class = CourseSerializer
     parser_classes = (MultiPartParser, FormParser)  # Allow file uploads for Course images
+    # Opt-in paging (?limit=/?offset= or ?cursor=/?page_size=), filters and ?ordering=
+    pagination_class = OptionalPagination
+    filter_backends = [CourseFilterBackend, StableOrderingFilter]
+    ordering_fields = ['id', 'created_at', 'title', 'rating_count', 'rating_average']
+    ordering = ['id']
+
+    def get_queryset(self):
+        # 0 rather than NULL for unrated courses: the cursor filter compares
+        # against rating_average, and NULL compares as neither larger nor smaller
+        return Course.objects.annotate(
+            rating_average=Coalesce(
+                Cast('rating_sum', FloatField()) / NullIf('rating_count', 0), 0.0, output_field=FloatField(),
+            ),
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_JSON:
+            return super().list(request, *args, **kwargs)
+        # The paginator and ?ordering= may need rating_average, so the rows keep it
+        rows = self.filter_queryset(self.get_queryset()).values(*CourseValuesSerializer.columns, 'rating_average')
+        page = self.paginate_queryset(rows)
+        serializer = CourseValuesSerializer(rows if page is None else page, context=self.get_serializer_context())
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
 
     def perform_create(self, serializer):
         serializer.save()
@@ -87,128 +156,367 @@ class CourseViewSet(viewsets.ModelViewSet):
 class CourseDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @course_condition
+    @cache_course_response(cache.RESOURCE_DETAIL)
     def get(self, request, course_id):
         try:
+            # Average and count are read from the counters on the course row
             course = Course.objects.get(id=course_id)
-            serializer = CourseDetailSerializer(course)
+            ratings_limit, ratings_offset = parse_limit_offset(request, 'ratings_limit', 'ratings_offset')
+            serializer = CourseDetailSerializer(course, context={
+                'include_ratings': request.query_params.get('ratings') not in ('0', 'false'),
+                'ratings_limit': ratings_limit,
+                'ratings_offset': ratings_offset,
+            })
             return Response(serializer.data)
         except Course.DoesNotExist:
             return Response(COURSE_NOT_FOUND_MESSAGE, status=STATUS_NOT_FOUND)
 
     def post(self, request, course_id):
+        rating_value = request.data.get('rating')
+
+        if rating_value not in [1, 2, 3, 4, 5]:
+            return Response(RATING_ERROR_MESSAGE, status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            course = Course.objects.get(id=course_id)
-            rating_value = request.data.get('rating')
+            with transaction.atomic():
+                # Bumping the counters doubles as the course existence check
+                updated = Course.objects.filter(pk=course_id).update(
+                    rating_sum=F('rating_sum') + rating_value,
+                    rating_count=F('rating_count') + 1,
+                )
+                if not updated:
+                    return Response(COURSE_NOT_FOUND_MESSAGE, status=STATUS_NOT_FOUND)
+                # A second rating by the same user violates unique_rating_per_user and rolls back the counters
+                Rating.objects.create(course_id=course_id, user=request.user, rating=rating_value)
+        except IntegrityError:
+            return Response(ALREADY_RATED_ERROR_MESSAGE, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"message": "Rating submitted successfully!"}, status=status.HTTP_201_CREATED)
+
+
+class RatingImportView(APIView):
+    permission_classes = [IsAdminUser]
 
-            if rating_value not in [1, 2, 3, 4, 5]:
-                return Response(RATING_ERROR_MESSAGE, status=status.HTTP_400_BAD_REQUEST)
+    def post(self, request, course_id):
+        serializer = RatingImportSerializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        rows = serializer.validated_data
+
+        user_ids = dict(
+            CustomUser.objects.filter(email__in={row['email'] for row in rows}).values_list('email', 'id')
+        )
+        ratings = [
+            Rating(course_id=course_id, user_id=user_ids[row['email']], rating=row['rating'])
+            for row in rows
+            if row['email'] in user_ids
+        ]
+
+        course = Course.objects.filter(pk=course_id)
+        if not course.exists():
+            return Response(COURSE_NOT_FOUND_MESSAGE, status=STATUS_NOT_FOUND)
 
-            # Check if the user has already rated this course
-            if Rating.objects.filter(course=course, user=request.user).exists():
-                return Response(ALREADY_RATED_ERROR_MESSAGE, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            existing = Rating.objects.filter(course_id=course_id)
+            before = existing.count()
+            # Users who already rated the course are skipped by the unique constraint
+            Rating.objects.bulk_create(ratings, batch_size=RATING_IMPORT_BATCH_SIZE, ignore_conflicts=True)
+            created = existing.count() - before
+            course.rebuild_rating_counters()
+        # bulk_create does not send post_save, so bump the version and drop the cached detail here
+        course.touch()
+        cache.invalidate(course_id, cache.RESOURCE_DETAIL)
+
+        return Response({
+            "created": created,
+            "skipped": len(rows) - created,
+            "unknown_emails": sorted({row['email'] for row in rows} - user_ids.keys()),
+        }, status=status.HTTP_201_CREATED)
+
+
+class CourseBundleView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    # section name -> (related name on Course, serializer)
+    sections = {
+        'comments': ('comments', CommentSerializer),
+        **{
+            kind: (model._meta.get_field('course').remote_field.related_name, CONTENT_SERIALIZERS[kind])
+            for kind, model in CONTENT_MODELS.items()
+        },
+    }
+
+    @course_condition
+    @cache_course_response(cache.RESOURCE_BUNDLE)
+    def get(self, request, course_id):
+        # ?include=course,comments,... picks sections; everything by default
+        include = request.query_params.get('include')
+        requested = include.split(',') if include else ['course', *self.sections]
+        unknown = set(requested) - {'course', *self.sections}
+        if unknown:
+            return Response({"error": f"Unknown sections: {', '.join(sorted(unknown))}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        prefetches = []
+        for name in requested:
+            if name not in self.sections:
+                continue
+            related_name, serializer_class = self.sections[name]
+            queryset = serializer_class.Meta.model.objects.all()
+            if name == 'comments':
+                queryset = queryset.select_related('user').order_by('-timestamp', '-id')
+                comments_limit, _ = parse_limit_offset(request, 'comments_limit')
+                if comments_limit is not None:
+                    queryset = queryset[:comments_limit]
+            prefetches.append(Prefetch(related_name, queryset=queryset, to_attr=f'bundle_{name}'))
 
-            # Save the rating directly without assigning to a variable
-            Rating.objects.create(course=course, user=request.user, rating=rating_value)
-            return Response({"message": "Rating submitted successfully!"}, status=status.HTTP_201_CREATED)
+        try:
+            course = Course.objects.prefetch_related(*prefetches).get(id=course_id)
         except Course.DoesNotExist:
             return Response(COURSE_NOT_FOUND_MESSAGE, status=STATUS_NOT_FOUND)
 
-class AssignmentListView(generics.ListAPIView):
-    serializer_class = AssignmentSerializer
+        context = {'request': request}
+        bundle = {}
+        if 'course' in requested:
+            bundle['course'] = CourseDetailSerializer(course, context={
+                'include_ratings': request.query_params.get('ratings') not in ('0', 'false'),
+            }).data
+        for name in requested:
+            if name in self.sections:
+                serializer_class = self.sections[name][1]
+                bundle[name] = serializer_class(getattr(course, f'bundle_{name}'), many=True, context=context).data
+        return Response(bundle, status=status.HTTP_200_OK)
 
-    def get_queryset(self):
-        course_id = self.kwargs['course_id']
-        return Assignment.objects.filter(course_id=course_id)
 
+class CourseContentViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
+    """
+    List, create and delete views shared by every CourseContent type.
 
-class AssignmentCreateView(generics.CreateAPIView):
-    serializer_class = AssignmentSerializer
-    parser_classes = (MultiPartParser, FormParser)
+    Routes set ``kind`` (see urls.py), which picks the model and serializer,
+    and doubles as the cache resource name.
+    """
+    kind = None
+    parser_classes = (MultiPartParser, FormParser)  # Allow file uploads
 
+    @property
+    def model(self):
+        return CONTENT_MODELS[self.kind]
 
-class AssignmentDeleteView(APIView):
-    def delete(self, request, pk):
+    @property
+    def cache_resource(self):
+        return self.kind
+
+    def get_serializer_class(self):
+        return CONTENT_SERIALIZERS[self.kind]
+
+    def get_queryset(self):
+        course_id = self.kwargs['course_id']
+        return self.model.objects.filter(course_id=course_id)
+
+    @course_condition
+    @cache_course_response()
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    def get_permissions(self):
+        if self.action == 'download':
+            return [IsAuthenticated()]
+        return super().get_permissions()
+
+    def download(self, request, pk):
+        # ?field=image downloads the image instead of the document
+        field = request.query_params.get('field', 'file')
+        if field not in ('file', 'image'):
+            return Response({"error": "field must be 'file' or 'image'"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            content = self.model.objects.only(field, 'title').get(pk=pk)
+        except self.model.DoesNotExist:
+            return Response({"error": f"{self.model.label} not found"}, status=STATUS_NOT_FOUND)
+        field_file = getattr(content, field)
+        if not field_file or not field_file.storage.exists(field_file.name):
+            return Response({"error": "File not found"}, status=STATUS_NOT_FOUND)
+        return file_download_response(request, field_file, download_name(field_file.name, content.title))
+
+    def destroy(self, request, pk):
         try:
-            assignment = Assignment.objects.get(pk=pk)
-            assignment.delete()
-            return Response({"message": "Assignment deleted successfully"}, status=status.HTTP_200_OK)
-        except Assignment.DoesNotExist:
-            return Response({"error": "Assignment not found"}, status=STATUS_NOT_FOUND)
+            content = self.model.objects.get(pk=pk)
+            content.delete()
+            return Response({"message": f"{self.model.label} deleted successfully"}, status=status.HTTP_200_OK)
+        except self.model.DoesNotExist:
+            return Response({"error": f"{self.model.label} not found"}, status=STATUS_NOT_FOUND)
 
 
-class UserStatusView(APIView):
+class CourseContentListView(APIView):
+    @course_condition
+    @cache_course_response(cache.RESOURCE_CONTENT)
+    def get(self, request, course_id):
+        # ?kind=assignments,quizzes narrows the listing; every kind by default
+        kind = request.query_params.get('kind')
+        kinds = kind.split(',') if kind else list(CONTENT_MODELS)
+        unknown = set(kinds) - CONTENT_MODELS.keys()
+        if unknown:
+            return Response({"error": f"Unknown kinds: {', '.join(sorted(unknown))}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # One UNION ALL statement; each branch is an index lookup on its course_id
+        branches = [
+            CONTENT_MODELS[name].objects.filter(course_id=course_id)
+            .annotate(kind=Value(name, output_field=CharField()))
+            .values('kind', 'id', 'title', 'description', 'image', 'file', 'course')
+            for name in kinds
+        ]
+        rows = branches[0].union(*branches[1:], all=True).order_by('kind', 'id')
+        serializer = ContentSummarySerializer(rows, many=True, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class SearchView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        # Check if the current user is an alumni
-        is_alumni = Alumni.objects.filter(email=request.user.email).exists()
-        return Response({"is_alumni": is_alumni})
-
+        # ?q= terms are prefix-matched; ?kind=courses,comments,... narrows the result types
+        query = request.query_params.get('q', '')
+        kind = request.query_params.get('kind')
+        kinds = kind.split(',') if kind else None
+        if kinds and set(kinds) - search.SEARCH_KINDS.keys():
+            return Response({"error": f"kind must be one of: {', '.join(search.SEARCH_KINDS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        limit, _ = parse_limit_offset(request)
+        results = search.get_backend().search(query, kinds=kinds, limit=limit or SEARCH_DEFAULT_LIMIT)
+        return Response({"results": results}, status=status.HTTP_200_OK)
 
-class QuizzListView(generics.ListAPIView):
-    serializer_class = QuizzSerializer
-
-    def get_queryset(self):
-        course_id = self.kwargs['course_id']
-        return Quizz.objects.filter(course_id=course_id)
 
+class UserStatusView(APIView):
+    permission_classes = [IsAuthenticated]
 
-class QuizzCreateView(generics.CreateAPIView):
-    serializer_class = QuizzSerializer
-    parser_classes = (MultiPartParser, FormParser)
+    def get(self, request):
+        # Read from the token claim, or the per-process alumni cache for older tokens
+        return Response({"is_alumni": alumni.status_for(request)})
 
 
-class QuizzDeleteView(APIView):
-    def delete(self, request, pk):
-        try:
-            quizz = Quizz.objects.get(pk=pk)
-            quizz.delete()
-            return Response({"message": "Quizz deleted successfully"}, status=status.HTTP_200_OK)
-        except Quizz.DoesNotExist:
-            return Response({"error": "Quizz not found"}, status=STATUS_NOT_FOUND)
+class LiveFeedTokenView(APIView):
+    permission_classes = [IsAuthenticated]
 
+    def post(self, request, course_id):
+        # For EventSource, which cannot send the Authorization header the live feed needs
+        if not Course.objects.filter(pk=course_id).exists():
+            return Response(COURSE_NOT_FOUND_MESSAGE, status=STATUS_NOT_FOUND)
+        return Response({
+            "token": live_feed_token(request.user.id, course_id),
+            "expires_in": settings.LIVE_FEED_TOKEN_LIFETIME,
+        })
 
-class PastPaperListView(generics.ListAPIView):
-    serializer_class = PastPaperSerializer
 
-    def get_queryset(self):
-        course_id = self.kwargs['course_id']
-        return PastPaper.objects.filter(course_id=course_id)
+class CacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
 
+    def get(self, request):
+        return Response(cache.get_stats())
 
-class PastPaperCreateView(generics.CreateAPIView):
-    serializer_class = PastPaperSerializer
-    parser_classes = (MultiPartParser, FormParser)
 
+class UploadSessionView(APIView):
+    permission_classes = [IsAuthenticated]
 
-class PastPaperDeleteView(APIView):
-    def delete(self, request, pk):
-        try:
-            pastpaper = PastPaper.objects.get(pk=pk)
-            pastpaper.delete()
-            return Response({"message": "Past paper deleted successfully"}, status=status.HTTP_200_OK)
-        except PastPaper.DoesNotExist:
-            return Response({"error": "Past paper not found"}, status=STATUS_NOT_FOUND)
+    def post(self, request):
+        # Step 1: declare the file (size and SHA-256) and get an upload id back
+        serializer = UploadSessionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+        uploads.purge_expired()
+        with transaction.atomic():
+            # Locking the user row keeps concurrent requests from both passing the cap
+            CustomUser.objects.select_for_update().only('pk').get(pk=request.user.id)
+            if UploadSession.objects.open().filter(user_id=request.user.id).count() >= settings.CHUNKED_UPLOAD_MAX_OPEN:
+                return Response({"error": "Too many uploads in progress, finish or cancel one first"},
+                                status=status.HTTP_429_TOO_MANY_REQUESTS)
+            session = serializer.save(user=request.user)
+        uploads.create_partial(session)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-class CourseMaterialListView(generics.ListAPIView):
-    serializer_class = CourseMaterialSerializer
 
-    def get_queryset(self):
-        course_id = self.kwargs['course_id']
-        return CourseMaterial.objects.filter(course_id=course_id)
+class UploadSessionDetailView(APIView):
+    permission_classes = [IsAuthenticated]
 
+    def get(self, request, upload_id):
+        # Resuming clients read "offset" to learn where to continue from
+        try:
+            session = UploadSession.objects.open().get(pk=upload_id, user_id=request.user.id)
+            return Response(UploadSessionSerializer(session).data)
+        except UploadSession.DoesNotExist:
+            return Response(UPLOAD_NOT_FOUND_MESSAGE, status=STATUS_NOT_FOUND)
+
+    def put(self, request, upload_id):
+        # Step 2: send the raw bytes for [offset, offset + Content-Length)
+        with transaction.atomic():
+            # The row stays locked from the offset check through the write to the
+            # offset update, so a concurrent retry can neither truncate nor skip bytes
+            try:
+                session = UploadSession.objects.open().select_for_update().get(pk=upload_id, user_id=request.user.id)
+            except UploadSession.DoesNotExist:
+                return Response(UPLOAD_NOT_FOUND_MESSAGE, status=STATUS_NOT_FOUND)
+
+            try:
+                offset = int(request.query_params.get('offset', session.received))
+                length = int(request.META.get('CONTENT_LENGTH') or 0)
+            except ValueError:
+                return Response({"error": "offset and Content-Length must be integers"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if offset != session.received:
+                return Response({"error": "Chunk does not start at the current offset", "offset": session.received},
+                                status=status.HTTP_409_CONFLICT)
+            if not 0 < length <= settings.CHUNKED_UPLOAD_MAX_CHUNK or offset + length > session.size:
+                return Response({"error": "Chunk is empty, too large or past the declared size"},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            written = uploads.write_chunk(session, offset, request.stream, length)
+            # Still conditional for databases without row locks (SQLite)
+            updated = UploadSession.objects.filter(pk=session.pk, received=offset).update(
+                received=offset + written, expires_at=upload_session_expiry()
+            )
+            if not updated:
+                return Response({"error": "Upload changed concurrently, read the offset and retry"},
+                                status=status.HTTP_409_CONFLICT)
+        return Response({"offset": offset + written}, status=status.HTTP_200_OK)
+
+    def delete(self, request, upload_id):
+        try:
+            session = UploadSession.objects.open().get(pk=upload_id, user_id=request.user.id)
+        except UploadSession.DoesNotExist:
+            return Response(UPLOAD_NOT_FOUND_MESSAGE, status=STATUS_NOT_FOUND)
+        uploads.discard_partial(session)
+        session.delete()
+        return Response({"message": "Upload cancelled"}, status=status.HTTP_200_OK)
 
-class CourseMaterialCreateView(generics.CreateAPIView):
-    serializer_class = CourseMaterialSerializer
-    parser_classes = (MultiPartParser, FormParser)
 
+class UploadSessionCompleteView(APIView):
+    permission_classes = [IsAuthenticated]
 
-class CourseMaterialDeleteView(APIView):
-    def delete(self, request, pk):
+    def post(self, request, upload_id):
+        # Step 3: verify the checksum and create the content row
         try:
-            coursematerial = CourseMaterial.objects.get(pk=pk)
-            coursematerial.delete()
-            return Response({"message": "Course material deleted successfully"}, status=status.HTTP_200_OK)
-        except CourseMaterial.DoesNotExist:
-            return Response({"error": "Course material not found"}, status=STATUS_NOT_FOUND)
+            session = UploadSession.objects.open().get(pk=upload_id, user_id=request.user.id)
+        except UploadSession.DoesNotExist:
+            return Response(UPLOAD_NOT_FOUND_MESSAGE, status=STATUS_NOT_FOUND)
+
+        if session.received != session.size:
+            return Response({"error": "Upload is incomplete", "offset": session.received},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if uploads.sha256_of(session) != session.sha256:
+            uploads.discard_partial(session)
+            session.delete()
+            return Response({"error": "Checksum mismatch, start the upload again"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        content = CONTENT_MODELS[session.kind](
+            course_id=session.course_id, title=session.title, description=session.description
+        )
+        with open(uploads.partial_path(session), 'rb') as handle:
+            # Moved into MEDIA_ROOT rather than copied
+            content.file.save(session.filename, uploads.AssembledFile(handle), save=False)
+        content.save()
+        session.delete()
+        uploads.discard_partial(session)
+
+        serializer = CONTENT_SERIALIZERS[session.kind](content, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)